@@ -0,0 +1,207 @@
+"""Throughput of the hot paths of the constraint engine on the COLLIE-v1 examples, compared with a
+baseline recorded on this machine so that regressions are caught.
+
+Every metric is an operation rate (higher is better), the best of `--repeat` runs of at least 0.2s:
+- check/<family>: `constraint.check(example, targets)` per second on the examples of the constraints
+  of collie/examples/<family>_constraints.py
+- tokenize/<level>: MB of example text per second split into units by `TargetLevel(level)`
+- extract/<family>: sequences per second run through all the ConstraintExtractors of their constraint
+- render/prompt and render/feedback: `ConstraintRenderer(...).prompt` and `.get_feedback(example)` per second
+
+Usage: python benchmarks/bench_constraints.py [--data data/all_data.dill] [--repeat 3] [--tokenizer regex]
+           [--only check,tokenize] [--baseline benchmarks/baselines/<tokenizer>.json] [--tolerance 0.3] [--save] [--strict]
+Timings depend on the machine, so baselines are not part of the repo: the first run records one (so does
+--save). Metrics slower than the baseline by more than the tolerance are reported, with --strict they
+also make the script exit with status 1.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import dill
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from collie.constraints import TargetLevel
+from collie.constraint_renderer import ConstraintRenderer
+from collie.tokenizers import set_tokenizer, preload
+from collie.examples.word_constraints import WORD_CONSTRAINTS
+from collie.examples.sent_constraints import SENT_CONSTRAINTS
+from collie.examples.para_constraints import PARA_CONSTRAINTS
+from collie.examples.passage_constraints import PASSAGE_CONSTRAINTS
+
+FAMILIES = {
+    "word": WORD_CONSTRAINTS,
+    "sent": SENT_CONSTRAINTS,
+    "para": PARA_CONSTRAINTS,
+    "passage": PASSAGE_CONSTRAINTS,
+}
+LEVELS = ["character", "word", "sentence", "paragraph"]
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def parse_args():
+    args = argparse.ArgumentParser()
+    args.add_argument('--data', type=str, default="data/all_data.dill")
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--tokenizer', type=str, default="regex")
+    args.add_argument('--only', type=str, default=None, help="comma separated groups: check, tokenize, extract, render")
+    args.add_argument('--baseline', type=str, default=None)
+    args.add_argument('--tolerance', type=float, default=0.3, help="allowed relative slowdown")
+    args.add_argument('--save', action='store_true', help="store the results as the baseline")
+    args.add_argument('--strict', action='store_true', help="exit with status 1 on a regression")
+    return args.parse_args()
+
+
+def load_examples(path:str):
+    # examples of every family, keyed by the family of the constraint name in the data key (e.g. guten_c07)
+    with open(path, "rb") as f:
+        all_data = dill.load(f)
+    examples = {family: [] for family in FAMILIES}
+    for key, items in all_data.items():
+        name = key.split("_")[-1]
+        family = next((family for family, constraints in FAMILIES.items() if name in constraints), None)
+        if family is None:
+            continue
+        examples[family].extend((name, item) for item in items)
+    return examples
+
+
+def best_time(func, repeat:int, min_time:float=0.2) -> float:
+    # seconds per call of func, the best of `repeat` runs that each call it for at least min_time
+    number, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_check(examples, repeat:int):
+    results = {}
+    for family, items in examples.items():
+        def run():
+            for _, item in items:
+                item["constraint"].check(item["example"], item["targets"])
+        results[f"check/{family}"] = len(items) / best_time(run, repeat)
+    return results
+
+
+def bench_tokenize(examples, repeat:int):
+    texts = [item["example"] for items in examples.values() for _, item in items]
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    results = {}
+    for level in LEVELS:
+        target_level = TargetLevel(level)
+        def run():
+            for text in texts:
+                target_level(text)
+        results[f"tokenize/{level}"] = megabytes / best_time(run, repeat)
+    return results
+
+
+def bench_extract(examples, repeat:int):
+    results = {}
+    for family, items in examples.items():
+        constraints = FAMILIES[family]
+        def run():
+            random.seed(0) # some post_extract functions sample targets
+            for name, item in items:
+                extractors = constraints[name] if isinstance(constraints[name], list) else [constraints[name]]
+                for extractor in extractors:
+                    list(extractor(item["example"]))
+        results[f"extract/{family}"] = len(items) / best_time(run, repeat)
+    return results
+
+
+def bench_render(examples, repeat:int):
+    items = [item for items in examples.values() for _, item in items]
+    def prompts():
+        for item in items:
+            ConstraintRenderer(item["constraint"], item["targets"]).prompt
+    def feedback():
+        for item in items:
+            ConstraintRenderer(item["constraint"], item["targets"]).get_feedback(item["example"])
+    return {
+        "render/prompt": len(items) / best_time(prompts, repeat),
+        "render/feedback": len(items) / best_time(feedback, repeat),
+    }
+
+
+GROUPS = {
+    "check": bench_check,
+    "tokenize": bench_tokenize,
+    "extract": bench_extract,
+    "render": bench_render,
+}
+
+
+def compare(results, baseline, tolerance:float):
+    # names of the metrics that are slower than baseline by more than tolerance
+    regressions = []
+    for metric, value in results.items():
+        reference = baseline.get(metric)
+        ratio = value / reference if reference else None
+        flag = ""
+        if ratio is not None and ratio < 1 - tolerance:
+            regressions.append(metric)
+            flag = "  REGRESSION"
+        change = f"{ratio:6.2f}x" if ratio is not None else "     -"
+        print(f"{metric:>18}: {value:12.2f}  baseline {reference or 0:12.2f}  {change}{flag}")
+    return regressions
+
+
+def save(path:str, tokenizer:str, results):
+    # add results to the baseline at path, metrics that were not run keep their stored value
+    stored = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)["results"]
+    stored.update({metric: round(value, 2) for metric, value in results.items()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "tokenizer": tokenizer,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": stored,
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    set_tokenizer(args.tokenizer)
+    preload()
+    examples = load_examples(args.data)
+    groups = args.only.split(",") if args.only else list(GROUPS)
+
+    results = {}
+    for group in groups:
+        results.update(GROUPS[group](examples, args.repeat))
+
+    path = args.baseline or os.path.join(BASELINES, f"{args.tokenizer}.json")
+    if args.save or not os.path.exists(path):
+        save(path, args.tokenizer, results)
+        for metric, value in results.items():
+            print(f"{metric:>18}: {value:12.2f}")
+        print(f"baseline saved to {path}")
+    else:
+        with open(path) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            if args.strict:
+                sys.exit(1)
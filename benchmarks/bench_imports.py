@@ -0,0 +1,60 @@
+"""Time to import collie modules in a fresh interpreter, and which heavy dependencies they load.
+
+Usage: python benchmarks/bench_imports.py [--repeat 5] [statement ...]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATEMENTS = [
+    "from collie.constraints import Constraint",
+    "from collie.constraint_renderer import ConstraintRenderer",
+    "from collie.extract_constraints import FullExtractor",
+    "import collie.models",
+    "import collie.examples.extract",
+]
+HEAVY = ["numpy", "nltk", "rich", "openai", "aiohttp", "tenacity", "google.generativeai", "datasets"]
+
+# run in the child: time the statement and report the heavy modules it imported
+_CHILD = """
+import sys, time, json
+start = time.perf_counter()
+exec({statement!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def parse_args():
+    args = argparse.ArgumentParser()
+    args.add_argument('statements', nargs='*', default=STATEMENTS)
+    args.add_argument('--repeat', type=int, default=5)
+    return args.parse_args()
+
+
+def import_time(statement:str, repeat:int) -> dict:
+    # best of `repeat` fresh interpreters, the interpreter start up itself is not counted
+    best, loaded = float("inf"), None
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD.format(statement=statement, heavy=HEAVY)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if out.returncode:
+            return {"error": out.stderr.strip().splitlines()[-1]}
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best, loaded = min(best, result["seconds"]), result["loaded"]
+    return {"seconds": best, "loaded": loaded}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for statement in args.statements:
+        result = import_time(statement, args.repeat)
+        if "error" in result:
+            print(f"{statement}: {result['error']}")
+            continue
+        print(f"{result['seconds'] * 1000:8.1f} ms  {statement}  (loads {', '.join(result['loaded']) or 'none'})")
@@ -0,0 +1,50 @@
+"""Throughput of the tokenizer backends on the COLLIE-v1 examples, and a check that they agree.
+
+Usage: python benchmarks/bench_tokenizers.py [--data data/all_data.dill] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import dill
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from collie.tokenizers import NLTKTokenizer, RegexTokenizer, compare_tokenizers
+
+
+def parse_args():
+    args = argparse.ArgumentParser()
+    args.add_argument('--data', type=str, default="data/all_data.dill")
+    args.add_argument('--repeat', type=int, default=3)
+    return args.parse_args()
+
+
+def load_texts(path:str):
+    with open(path, "rb") as f:
+        all_data = dill.load(f)
+    return [example["example"] for examples in all_data.values() for example in examples]
+
+
+def throughput(tokenize, texts, repeat:int) -> float:
+    # best of `repeat` runs, in MB of text per second
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            tokenize(text)
+        best = min(best, time.perf_counter() - start)
+    return megabytes / best
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    texts = load_texts(args.data)
+    backends = [NLTKTokenizer(), RegexTokenizer()]
+
+    mismatches = compare_tokenizers(texts, *backends)
+    print(f"{len(texts)} examples, {len(mismatches)} with different units")
+
+    for backend in backends:
+        words = throughput(backend.words, texts, args.repeat)
+        sentences = throughput(backend.sentences, texts, args.repeat)
+        print(f"{backend.name:>6}: words {words:8.2f} MB/s  sentences {sentences:8.2f} MB/s")
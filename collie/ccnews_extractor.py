@@ -1,12 +1,10 @@
 """Loader and extractor for CC-News"""
-import random
-import copy
-from typing import List, Callable
+from typing import Callable, Iterable
 from datasets import load_dataset, Dataset
 
 import nltk
 from .extractor_utils import (
-    TextLoader,
+    DatasetLoader,
     chain_filters,
     url_filter,
     copyright_filter,
@@ -24,37 +22,34 @@ def get_ccnews_filter() -> Callable[[str], bool]:
     )
 
 
-class CCNewsLoader(TextLoader):
+class CCNewsLoader(DatasetLoader):
     """class for iterating over Gutenberg, dammit files.""" 
-    def __init__(self, cache_dir:str=None, randomize:bool=False, **kwargs):
-        self.randomize = randomize
-        self.dataset:Dataset = load_dataset(
+    def __init__(
+        self,
+        cache_dir:str=None,
+        randomize:bool=False,
+        streaming:bool=False,
+        columns:Iterable[str]=None,
+        batch_size:int=1000,
+        buffer_size:int=10000,
+        seed:int=None,
+        **kwargs
+    ):
+        dataset:Dataset = load_dataset(
             "cc_news",
             split="train",
             cache_dir=cache_dir,
             **kwargs
         )
-        self.indices:List = None
-
-    def __iter__(self):
-        self.indices = list(range(len(self.dataset)))
-        if self.randomize:
-            random.shuffle(self.indices)
-        def metadata_iter():
-            for idx in self.indices:
-                datadict = copy.deepcopy(self.dataset[idx])
-                txt = datadict.pop("text")
-                datadict["index"] = idx
-                yield txt, datadict 
-        self._metadata_iter = metadata_iter()
-        return self
-    
-    def __next__(self):
-        txt, meta = next(self._metadata_iter)
-        return txt, meta
-    
-    def __len__(self):
-        return len(self.dataset)
+        super().__init__(
+            dataset,
+            randomize=randomize,
+            streaming=streaming,
+            columns=columns,
+            batch_size=batch_size,
+            buffer_size=buffer_size,
+            seed=seed,
+        )
 
 
 if __name__ == "__main__":
@@ -72,7 +67,9 @@ if __name__ == "__main__":
 
     textloader = CCNewsLoader(
         cache_dir="./data",
-        randomize=True
+        randomize=True,
+        streaming=True,
+        columns=("title",)
     )
 
     chunker = TextChunker(
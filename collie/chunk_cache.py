@@ -0,0 +1,199 @@
+"""Disk cache of the chunks a TextChunker makes of the documents of a TextLoader."""
+import os
+import re
+import json
+import mmap
+import types
+import shutil
+import hashlib
+import itertools
+from pathlib import Path
+from typing import Any, Dict, Iterable, Tuple
+import numpy as np
+from tqdm.autonotebook import tqdm
+
+from .extractor_utils import TextChunker, TextLoader, Processor, Substitution, FilterChain
+
+
+def _hash_code(code:types.CodeType, h):
+    # bytecode, names and constants of code and of the code objects nested in it (lambdas, comprehensions),
+    # whose repr would include their memory address
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(const, h)
+        elif isinstance(const, frozenset): # iteration order depends on the hash seed
+            h.update(repr(sorted(repr(c) for c in const)).encode())
+        else:
+            h.update(repr(const).encode())
+
+
+def describe(obj:Any) -> Any:
+    # json serializable description of a setting, that changes when its behavior may change
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, (list, tuple)):
+        return [describe(x) for x in obj]
+    if isinstance(obj, dict):
+        return {str(k): describe(v) for k, v in obj.items()}
+    if hasattr(obj, "_fingerprint"): # HuggingFace datasets
+        return obj._fingerprint
+    if isinstance(obj, re.Pattern):
+        return obj.pattern
+    if isinstance(obj, Processor):
+        return {"Processor": describe(obj.passes)}
+    if isinstance(obj, Substitution):
+        return [obj.pattern.pattern, obj.repl]
+    if isinstance(obj, FilterChain):
+        return {"FilterChain": describe(obj.funcs)}
+    if isinstance(obj, (types.FunctionType, types.MethodType)):
+        h = hashlib.sha1()
+        _hash_code(obj.__code__, h)
+        return {
+            "function": f"{obj.__module__}.{obj.__qualname__}",
+            "code": h.hexdigest(),
+            "closure": [describe(cell.cell_contents) for cell in obj.__closure__ or ()],
+        }
+    if isinstance(obj, types.BuiltinFunctionType):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if not hasattr(obj, "__dict__"):
+        raise TypeError(f"Can't fingerprint a {type(obj).__qualname__}, give the loader an explicit `cache_key`.")
+    return {"class": type(obj).__qualname__, **settings(obj)}
+
+
+def settings(obj:Any) -> Dict[str, Any]:
+    # public attributes of a loader or callable, except the iteration state listed in `_state_attributes`
+    state = getattr(obj, "_state_attributes", ())
+    return {k: describe(v) for k, v in vars(obj).items() if not k.startswith("_") and k not in state}
+
+
+def chunker_settings(chunker:TextChunker) -> Dict[str, Any]:
+    return {
+        "paragraph_delim": chunker.paragraph_delim,
+        "preprocessor": describe(chunker.preprocessor),
+        "postprocessor": describe(chunker.postprocessor),
+        "filter": describe(chunker.filter),
+        "randomize": chunker.randomize,
+        "chunk_by_sentence": chunker.chunk_by_sentence,
+        "chunk_by_passage": chunker.chunk_by_passage,
+        "lazy": chunker.lazy,
+        "buffer_size": chunker.buffer_size,
+    }
+
+
+def fingerprint(loader:TextLoader, chunker:TextChunker, **options) -> str:
+    if getattr(loader, "cache_key", None) is not None:
+        loader_description = loader.cache_key
+    elif hasattr(loader, "__dict__"):
+        loader_description = {"class": type(loader).__qualname__, **settings(loader)}
+    else: # plain iterables of (text, metadata) are described by their content
+        loader_description = describe(loader)
+    description = {
+        "loader": loader_description,
+        "chunker": chunker_settings(chunker),
+        "options": describe(options),
+    }
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()[:20]
+
+
+class ChunkCache:
+    """
+    Chunks of the documents of a loader, as one UTF-8 file with memory mapped offsets, the index of
+    the document of every chunk and the metadata of every document.
+
+    A randomized loader or chunker is cached as the sample drawn when the cache was built.
+    """
+    version = 1
+
+    def __init__(self, path:str):
+        self.path = Path(path)
+        self.meta = json.loads(self.path.joinpath("meta.json").read_text())
+        if self.meta["version"] != self.version:
+            raise ValueError(f"Chunk cache at {path} has version {self.meta['version']}, expected {self.version}.")
+        self.offsets = np.load(self.path.joinpath("offsets.npy"), mmap_mode="r")
+        self.documents = np.load(self.path.joinpath("documents.npy"), mmap_mode="r")
+        self.metadata = json.loads(self.path.joinpath("metadata.json").read_text())
+        self._file = self.path.joinpath("chunks.bin").open("rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    @classmethod
+    def get(
+        cls,
+        cache_dir:str,
+        loader:TextLoader,
+        chunker:TextChunker,
+        max_documents:int=None,
+        max_seq_per_document:int=None,
+        metadata_fields:Iterable=None,
+    ) -> "ChunkCache":
+        # the cached chunks for these settings, building them first if needed
+        key = fingerprint(
+            loader, chunker,
+            max_documents=max_documents,
+            max_seq_per_document=max_seq_per_document,
+            metadata_fields=list(metadata_fields) if metadata_fields is not None else None,
+        )
+        path = Path(cache_dir).joinpath(key)
+        if not path.joinpath("meta.json").exists():
+            cls.build(path, loader, chunker, max_documents, max_seq_per_document, metadata_fields)
+        return cls(path)
+
+    @staticmethod
+    def build(
+        path:str,
+        loader:TextLoader,
+        chunker:TextChunker,
+        max_documents:int=None,
+        max_seq_per_document:int=None,
+        metadata_fields:Iterable=None,
+    ):
+        # written to a temporary directory first, so an interrupted build is never read
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        tmp.mkdir(parents=True, exist_ok=True)
+        offsets, documents, metadatas = [0], [], []
+        passage_iter = itertools.islice(loader, 0, max_documents) if max_documents is not None else loader
+        with tmp.joinpath("chunks.bin").open("wb") as f:
+            for passage, metadata in tqdm(passage_iter, total=max_documents, leave=False):
+                if metadata_fields is not None:
+                    metadata = {k: metadata[k] for k in metadata_fields if k in metadata}
+                seq_iter = chunker(passage)
+                if max_seq_per_document is not None:
+                    seq_iter = itertools.islice(seq_iter, 0, max_seq_per_document)
+                for seq in seq_iter:
+                    data = seq.encode()
+                    f.write(data)
+                    offsets.append(offsets[-1] + len(data))
+                    documents.append(len(metadatas))
+                metadatas.append(metadata)
+        np.save(tmp.joinpath("offsets.npy"), np.array(offsets, dtype=np.int64))
+        np.save(tmp.joinpath("documents.npy"), np.array(documents, dtype=np.int64))
+        tmp.joinpath("metadata.json").write_text(json.dumps(metadatas, default=str))
+        tmp.joinpath("meta.json").write_text(json.dumps({
+            "version": ChunkCache.version,
+            "num_chunks": len(documents),
+            "num_documents": len(metadatas),
+        }))
+        try:
+            os.replace(tmp, path)
+        except OSError: # built concurrently by another process
+            shutil.rmtree(tmp)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def chunk(self, i:int) -> str:
+        return self._data[self.offsets[i]:self.offsets[i + 1]].decode()
+
+    def __iter__(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        # (chunk, metadata of its document) in the order they were produced
+        for i in range(len(self)):
+            yield self.chunk(i), self.metadata[self.documents[i]]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
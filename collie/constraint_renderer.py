@@ -1,8 +1,68 @@
-import numpy as np
 from typing import Union, List, Any
+from collections import namedtuple
 from collie.constraints import *
-import openai
 import os
+import re
+import weakref
+import multiprocessing
+from collie.tokenizers import get_tokenizer, set_tokenizer, preload
+
+# Prompts are cached as templates per constraint shape: the prompt is rendered once with the
+# check values replaced by slots that print as markers, and the markers are filled in afterwards.
+_SLOT_OPEN, _SLOT_CLOSE = "\ue000", "\ue001"
+_SLOT = re.compile(f"{_SLOT_OPEN}(\\d+){_SLOT_CLOSE}")
+# string values the renderer could quote, escape or match while editing the prompt are not cached
+_UNSAFE_VALUE = re.compile(f"['\"\\\\@{_SLOT_OPEN}{_SLOT_CLOSE}]|[^\\S ]|\\b(?:all|with)\\b")
+
+TemplateCacheInfo = namedtuple("TemplateCacheInfo", ["hits", "misses", "bypassed", "currsize"])
+
+
+class _IntSlot(int):
+    # keeps the value for comparisons but prints as a marker
+    def __new__(cls, value:int, marker:str):
+        slot = super().__new__(cls, value)
+        slot.marker = marker
+        return slot
+
+    def __str__(self):
+        return self.marker
+
+    __repr__ = __str__
+
+    def __format__(self, spec):
+        return self.marker
+
+
+def _value_shape(value:Any, leaves:List[Any]):
+    # everything the renderer branches on, None if the value can't be templated; collects the leaf values
+    kind = type(value)
+    if kind is int:
+        leaves.append(value)
+        return min(max(value, -1), 2)
+    if kind is str:
+        if not value or not value.isprintable() or _UNSAFE_VALUE.search(value):
+            return None
+        leaves.append(value)
+        return 'str'
+    if kind is list:
+        shapes = tuple(_value_shape(v, leaves) for v in value)
+        return None if None in shapes else shapes
+    return None
+
+
+def _to_slots(value:Any, leaves:List[Any]) -> Any:
+    if type(value) is list:
+        return [_to_slots(v, leaves) for v in value]
+    marker = f"{_SLOT_OPEN}{len(leaves)}{_SLOT_CLOSE}"
+    leaves.append(value)
+    return _IntSlot(value, marker) if type(value) is int else marker
+
+
+def _compile_template(prompt:str) -> str:
+    # turns the markers of a prompt rendered with slots into str.format fields
+    prompt = prompt.replace("{", "{{").replace("}", "}}")
+    return _SLOT.sub(lambda m: "{" + m.group(1) + "}", prompt)
+
 
 class ConstraintRenderer:
     # Mapping of relations to their respective text
@@ -26,7 +86,13 @@ class ConstraintRenderer:
         'passage': 5
     }
 
-    def __init__(self, constraint: Union[Constraint, Logic], check_value: Any, gpt_polish: bool = False, enforce_g_level: str = None):
+    # (constraint type, constraint, enforce_g_level, value shape) -> (template, g_level)
+    _templates: dict = {}
+    _template_stats: dict = {'hits': 0, 'misses': 0, 'bypassed': 0}
+    # constraint -> (type, str) so that the structure of a constraint is only printed once
+    _structures = weakref.WeakKeyDictionary()
+
+    def __init__(self, constraint: Union[Constraint, Logic], check_value: Any, gpt_polish: bool = False, enforce_g_level: str = None, use_cache: bool = True):
         self.constraint = constraint
         # If constraint is an instance of Constraint, initialize necessary variables
         if isinstance(constraint, Constraint):
@@ -40,17 +106,59 @@ class ConstraintRenderer:
             self.relation = self.relation_map[constraint.relation.operand]
             self.check_value = check_value
             self.reduction = (constraint.reduction.reduction, constraint.reduction.value)
-            self.prompt = self.render_prompts_single_constraint(constraint)
-            if gpt_polish:
-                self.polished_prompt = self.polish_prompt(self.prompt)
         # If constraint is an instance of Logic, parse the constraints and render the prompts
         elif isinstance(constraint, Logic):
             self.g_level = enforce_g_level
-            constrains = self.parse_constraints(constraint)
             self.check_value = check_value
-            self.prompt = self.render_prompts_multiple_constraints(constrains)
-            if gpt_polish:
-                self.polished_prompt = self.polish_prompt(self.prompt)
+        else:
+            return
+        self.prompt = self.render_prompt(enforce_g_level) if use_cache else self._render_prompt()
+        if gpt_polish:
+            self.polished_prompt = self.polish_prompt(self.prompt)
+
+    def _render_prompt(self) -> str:
+        if isinstance(self.constraint, Constraint):
+            return self.render_prompts_single_constraint(self.constraint)
+        constrains = self.parse_constraints(self.constraint)
+        return self.render_prompts_multiple_constraints(constrains)
+
+    def render_prompt(self, enforce_g_level: str = None) -> str:
+        """
+        Renders the prompt from the cached template of the constraint shape, compiling it on a miss.
+        """
+        stats = self._template_stats
+        values = []
+        shape = _value_shape(self.check_value, values)
+        if shape is None:
+            stats['bypassed'] += 1
+            return self._render_prompt()
+        structure = self._structures.get(self.constraint)
+        if structure is None:
+            structure = self._structures[self.constraint] = (type(self.constraint), str(self.constraint))
+        key = (structure, enforce_g_level, shape)
+        entry = self._templates.get(key)
+        if entry is None:
+            stats['misses'] += 1
+            check_value = self.check_value
+            self.check_value = _to_slots(check_value, [])
+            try:
+                entry = self._templates[key] = (_compile_template(self._render_prompt()), self.g_level)
+            finally:
+                self.check_value = check_value
+        else:
+            stats['hits'] += 1
+        template, self.g_level = entry
+        return template.format(*values)
+
+    @classmethod
+    def template_cache_info(cls) -> TemplateCacheInfo:
+        return TemplateCacheInfo(currsize=len(cls._templates), **cls._template_stats)
+
+    @classmethod
+    def clear_template_cache(cls):
+        cls._templates.clear()
+        cls._structures.clear()
+        cls._template_stats.update(hits=0, misses=0, bypassed=0)
 
     def render_prompts_single_constraint(self, constraint: Constraint, check_value: Any = None, feedback_mode: bool = False) -> str:
         # Assign the check_value if provided
@@ -74,6 +182,7 @@ class ConstraintRenderer:
         # Handles nested constraints and logic operations
         # (e.g., ["and", [constraint1, constraint2]], ["all", [constraint1, constraint2, constraint3]])
         if isinstance(constraints, list):
+            import numpy as np
             if constraints[0] in ["and", "or"]:
                 prompt = [constraints[0], 
                             [self.render_prompts_multiple_constraints(constraints[1][0], check_value[0], feedback_mode),
@@ -129,6 +238,7 @@ class ConstraintRenderer:
         return "To Be Implemented."
 
     def polish_prompt(self, prompt: str):
+        import openai
         openai.organization = os.environ.get("OPENAI_ORG")
         openai.api_key = os.environ.get("OPENAI_API_KEY")
         res = openai.ChatCompletion.create(
@@ -403,11 +513,12 @@ class ConstraintRenderer:
 
     def get_feedback(self, text: str, gpt_polish: bool = False) -> str:
         # If constraint is an instance of Constraint, initialize necessary variables
-        if self.constraint.check(text, self.check_value):
+        # check and extract share the tokenization of the text
+        satisfied, observed_value = self.constraint.evaluate(text, self.check_value)
+        if satisfied:
             self.feedback = f"The generated {self.g_level} satisfies all constraints."
             return self.feedback
         else:
-            observed_value = self.constraint.extract(text)
             if isinstance(self.constraint, Constraint):
                 self.feedback = self.render_prompts_single_constraint(self.constraint, observed_value, feedback_mode=True)
                 self.feedback = f"Your task is to {self.prompt[7:]}"[:-1]+f".\nHowever, you {self.feedback[7:]}"
@@ -432,7 +543,8 @@ class ConstraintRenderer:
         else:
             return "passage"
 
-    def ordinal(self, n: int) -> str:
+    @staticmethod
+    def ordinal(n: int) -> str:
         """
         Converts an integer into its ordinal representation.
         """
@@ -440,3 +552,23 @@ class ConstraintRenderer:
             return "last"
         suffix = {1: 'st', 2: 'nd', 3: 'rd'}
         return str(n) + suffix.get(n % 10 if n % 100 not in (11, 12, 13) else 0, 'th')
+
+
+def _feedback(item: tuple) -> str:
+    constraint, check_value, text = item
+    return ConstraintRenderer(constraint, check_value).get_feedback(text)
+
+
+def batch_feedback(items: List[tuple], processes: int = None, chunksize: int = 32) -> List[str]:
+    """
+    Returns the feedback for each (constraint, check_value, generated text) in items, in order.
+    With processes > 1 the batch is split across a process pool, each worker keeps its own
+    template cache and uses a copy of the caller's tokenizer backend.
+    """
+    items = list(items)
+    if not processes or processes <= 1 or len(items) <= chunksize:
+        return [_feedback(item) for item in items]
+    preload() # forked workers inherit the sentence model
+    # the backend itself rather than its name, which may not be registered (custom or wrapped backends)
+    with multiprocessing.Pool(processes, initializer=set_tokenizer, initargs=(get_tokenizer(),)) as pool:
+        return pool.map(_feedback, items, chunksize=chunksize)
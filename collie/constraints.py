@@ -1,7 +1,15 @@
 from typing import List, Any, Callable, Iterable
-from nltk import word_tokenize, sent_tokenize
-from rich import print
+import re
 import string
+from .tokenizers import get_tokenizer, set_tokenizer
+
+
+def patch_literal(literal:Any) -> Any:
+    # remove artifacts and casing from a single literal, see Relation._patch_literal
+    if not isinstance(literal, str):
+        return literal
+    stripped = literal.lower().strip(string.punctuation + " ")
+    return literal if stripped == "" else stripped
 
 
 def sus_target(t:str):
@@ -27,11 +35,11 @@ class Level:
             if self.level == 'character':
                 tokenized = list(text)
             elif self.level == 'word':
-                tokenized = [x for x in word_tokenize(text) if x not in string.punctuation] 
+                tokenized = get_tokenizer().words(text)
             elif self.level == 'phrase':
                 raise NotImplementedError
             elif self.level == 'sentence':
-                tokenized = sent_tokenize(text)
+                tokenized = get_tokenizer().sentences(text)
             elif self.level == 'paragraph':
                 tokenized = self.split_paragraphs(text)
             elif self.level == 'passage':
@@ -216,6 +224,23 @@ class Logic:
     def check(self, x, target):
         return self(x, target)
 
+    def evaluate(self, x, target):
+        # check and extract every callable once, returns (satisfied, extracted)
+        results = [callable_.evaluate(x, t) for callable_, t in zip(self.callables, self._targets(target))]
+        return self._combine([sat for sat, _ in results]), [extracted for _, extracted in results]
+
+    def prefilter(self, x, target):
+        return self._combine([callable_.prefilter(x, t) for callable_, t in zip(self.callables, self._targets(target))])
+
+    def _targets(self, target):
+        if isinstance(target, list):
+            assert len(target) == len(self.callables)
+            return target
+        return [target] * len(self.callables)
+
+    def _combine(self, results:List[bool]) -> bool:
+        return all(results)
+
 
 class And(Logic):
     def __init__(self, callable_1, callable_2):
@@ -232,6 +257,10 @@ class And(Logic):
         else:
             return self.callable_1(x, target) and self.callable_2(x, target)
     
+    @property
+    def callables(self):
+        return (self.callable_1, self.callable_2)
+
     def __str__(self):
         return f'And({self.callable_1}, {self.callable_2})'
     
@@ -254,6 +283,13 @@ class Or(Logic):
         else:
             return self.callable_1(x, target) or self.callable_2(x, target)
     
+    @property
+    def callables(self):
+        return (self.callable_1, self.callable_2)
+
+    def _combine(self, results:List[bool]) -> bool:
+        return any(results)
+
     def __str__(self):
         return f'Or({self.callable_1}, {self.callable_2})'
     
@@ -274,6 +310,11 @@ class All(Logic):
         else:
             raise NotImplementedError
     
+    def _targets(self, target):
+        if not isinstance(target, list):
+            raise NotImplementedError
+        return target
+
     def __str__(self):
         return f"All({', '.join([str(c) for c in self.callables])})"
     
@@ -290,18 +331,10 @@ class Relation:
 
     def _patch_literal(self, literal:str):
         # apply transformations on literal to remove artifacts and casing
-
-        def _patch(literal:str):
-            # apply the patch if it is 
-            if not isinstance(literal, str):
-                return literal
-            stripped = literal.lower().strip(string.punctuation + " ")
-            return literal if stripped == "" else stripped
-        
         if isinstance(literal, list):
-            return [_patch(x) for x in literal]
+            return [patch_literal(x) for x in literal]
         
-        return _patch(literal)
+        return patch_literal(literal)
 
     def __call__(self, literal_1, literal_2):
         literal_1, literal_2 = self._patch_literal(literal_1), self._patch_literal(literal_2) 
@@ -373,6 +406,9 @@ class Reduction:
             return f'Reduction({self.reduction})'
 
 
+_sentence_ends = re.compile(r"[.?!]")
+
+
 class Constraint:
     def __init__(
         self,
@@ -399,7 +435,101 @@ class Constraint:
     
     def check(self, text, target):
         x = self.extract(text)
+        return self.check_extracted(x, target)
+
+    def check_extracted(self, x, target):
+        # check a value returned by extract, so it can be reused for several targets
         return self.reduction(x, target, self.relation)
+
+    def evaluate(self, text, target):
+        # check and extract with a single tokenization, returns (satisfied, extracted)
+        x = self.extract(text)
+        return self.check_extracted(x, target), x
+
+    def prefilter(self, text:str, target) -> bool:
+        """
+        Cheap necessary condition for check(text, target) that doesn't tokenize the text. Returns False
+        only if the constraint can't be satisfied, True when unsure.
+        """
+        if self.input_level is None or self.target_level is None:
+            return True # unpickled constraints (e.g. the c04 ones of all_data) may hold None levels
+        count = self._exact_count(text)
+        if count is not None and type(target) is int:
+            return self.relation(count, target)
+        if self._counts_units('sentence') and type(target) is int:
+            # every sentence but the last ends with one of .?!
+            return self._may_reach(len(_sentence_ends.findall(text)) + 1, target)
+        words = self._required_words(target)
+        if words:
+            lowered = text.lower()
+            return all(word in lowered for word in words)
+        return True
+
+    def _counts_units(self, level:str) -> bool:
+        # the constraint compares the number of `level` units of the whole text
+        return (
+            self.input_level.level is None
+            and self.target_level.level == level
+            and type(self.transformation) is Count
+            and self.transformation.count_target is None
+            and self.reduction.reduction is None
+        )
+
+    def _exact_count(self, text:str) -> int:
+        # number of units when it doesn't need tokenizing
+        if self._counts_units('character'):
+            return len(text)
+        if self._counts_units('paragraph'):
+            return len(Level.split_paragraphs(text))
+        return None
+
+    def _may_reach(self, bound:int, target:int) -> bool:
+        # can a count of at most `bound` satisfy the relation with target
+        if self.relation.operand in ('==', '>='):
+            return target <= bound
+        if self.relation.operand == '>':
+            return target < bound
+        return True
+
+    def _required_words(self, target) -> List[str]:
+        # lowercased words that have to be in the text for the constraint to hold. Units are slices of the
+        # text, so a unit that matches an ascii alphanumeric target contains it
+        if self.target_level.level is None:
+            return []
+        if self.relation.operand == '==':
+            single = self.input_level.level is None and self.reduction.reduction is None and type(self.transformation) is Position
+            each = (
+                self.input_level.level is not None
+                and type(self.transformation) is ForEach
+                and type(self.transformation.func) is Position
+                and self._some_match()
+            )
+            targets = [target] if single or each else []
+        elif self.relation.operand == 'in' and type(self.transformation) is ForEach and self.transformation.func is Ellipsis:
+            if self.input_level.level is None and self.reduction.reduction is None:
+                targets = target if isinstance(target, list) else [target]
+            elif self.input_level.level is not None and isinstance(target, list) and self.reduction.reduction == 'all':
+                # list targets are zipped with the units, only 'all' needs every one of them
+                targets = target
+            elif self.input_level.level is not None and not isinstance(target, list) and self._some_match():
+                targets = [target]
+            else:
+                targets = []
+        else:
+            targets = []
+        words = []
+        for t in targets:
+            t = patch_literal(t)
+            if not (isinstance(t, str) and t.isascii() and t.isalnum()):
+                return []
+            words.append(t)
+        return words
+
+    def _some_match(self) -> bool:
+        # the reduction needs at least one unit to satisfy the relation
+        if self.reduction.reduction == 'any':
+            return True
+        return self.reduction.reduction in ('at least', 'exactly') and isinstance(self.reduction.value, int) and self.reduction.value >= 1
     
     def __call__(self, text, target):
         return self.check(text, target)
@@ -0,0 +1,221 @@
+"""On-disk index of the chunks of a corpus, to extract constraints from candidate chunks only."""
+import os
+import json
+import mmap
+import shutil
+import itertools
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple, Union
+import numpy as np
+from tqdm.autonotebook import tqdm
+
+from .constraints import Constraint, TargetLevel, Count, Position, ForEach, patch_literal
+from .extractor_utils import ConstraintExtractor, TextChunker, TextLoader
+from .tokenizers import get_tokenizer
+
+
+_LEVELS = ('character', 'word', 'sentence', 'paragraph')
+
+
+class CorpusIndex:
+    """
+    Chunks of a corpus with their unit statistics: number of characters, words, sentences and
+    paragraphs, first and last word, and the postings of every (patched) word.
+
+    The statistics are computed with the same levels that constraints use, so `candidates` returns
+    exactly the chunks that satisfy the count, position and word membership conditions it knows
+    about, and every chunk for the other constraints.
+    """
+    version = 1
+
+    def __init__(self, path:str):
+        self.path = Path(path)
+        meta = json.loads(self.path.joinpath("meta.json").read_text())
+        if meta["version"] != self.version:
+            raise ValueError(f"Index at {path} has version {meta['version']}, expected {self.version}.")
+        self.tokenizer = meta["tokenizer"]
+        arrays = np.load(self.path.joinpath("stats.npz"))
+        self.counts = {level: arrays[level] for level in _LEVELS}
+        self.document, self.position = arrays["document"], arrays["position"]
+        self.first, self.last = arrays["first"], arrays["last"]
+        self._offsets = arrays["offsets"]
+        self._postings, self._postings_offsets = arrays["postings"], arrays["postings_offsets"]
+        self.words = json.loads(self.path.joinpath("words.json").read_text())
+        self._word_ids = {w: i for i, w in enumerate(self.words)}
+        self._chunks_file = self.path.joinpath("chunks.jsonl").open("rb")
+        self._chunks = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ) if self._offsets[-1] else b""
+
+    @classmethod
+    def build(
+        cls,
+        path:str,
+        loader:TextLoader,
+        chunker:TextChunker,
+        max_documents:int=None,
+        max_seq_per_document:int=None,
+        metadata_fields:Iterable=None,
+    ) -> "CorpusIndex":
+        # one pass over the loader, chunks are stored in the order they are produced. Written to a temporary
+        # directory first, so an interrupted build is never read
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        tmp.mkdir(parents=True, exist_ok=True)
+        stats = {level: [] for level in _LEVELS + ("document", "position", "first", "last")}
+        offsets = [0]
+        word_ids:Dict[str, int] = {}
+        postings:List[List[int]] = []
+        documents = itertools.islice(loader, 0, max_documents) if max_documents is not None else loader
+        word_level, sentence_level, paragraph_level = TargetLevel('word'), TargetLevel('sentence'), TargetLevel('paragraph')
+        chunk_id = 0
+        with tmp.joinpath("chunks.jsonl").open("wb") as f:
+            for document, (passage, metadata) in enumerate(tqdm(documents, total=max_documents, leave=False)):
+                if metadata_fields is not None:
+                    metadata = {k: metadata[k] for k in metadata_fields if k in metadata}
+                seqs = chunker(passage)
+                if max_seq_per_document is not None:
+                    seqs = itertools.islice(seqs, 0, max_seq_per_document)
+                for position, seq in enumerate(seqs):
+                    line = json.dumps({"text": seq, "metadata": metadata}, default=str).encode() + b"\n"
+                    f.write(line)
+                    offsets.append(offsets[-1] + len(line))
+                    words = [patch_literal(w) for w in word_level(seq)]
+                    stats["character"].append(len(seq))
+                    stats["word"].append(len(words))
+                    stats["sentence"].append(len(sentence_level(seq)))
+                    stats["paragraph"].append(len(paragraph_level(seq)))
+                    stats["document"].append(document)
+                    stats["position"].append(position)
+                    for word in set(words):
+                        if word not in word_ids:
+                            word_ids[word] = len(postings)
+                            postings.append([])
+                        postings[word_ids[word]].append(chunk_id)
+                    stats["first"].append(word_ids[words[0]] if words else -1)
+                    stats["last"].append(word_ids[words[-1]] if words else -1)
+                    chunk_id += 1
+        np.savez(
+            tmp.joinpath("stats.npz"),
+            offsets=np.array(offsets, dtype=np.int64),
+            postings=np.array([i for p in postings for i in p], dtype=np.int32),
+            postings_offsets=np.cumsum([0] + [len(p) for p in postings], dtype=np.int64),
+            **{k: np.array(v, dtype=np.int32) for k, v in stats.items()},
+        )
+        tmp.joinpath("words.json").write_text(json.dumps(list(word_ids)))
+        tmp.joinpath("meta.json").write_text(json.dumps({
+            "version": cls.version,
+            "tokenizer": get_tokenizer().name,
+            "num_chunks": chunk_id,
+        }))
+        if path.exists(): # replace an older index
+            old = path.with_name(f"{path.name}.old{os.getpid()}")
+            os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old)
+        else:
+            os.replace(tmp, path)
+        return cls(path)
+
+    def __len__(self):
+        return len(self.document)
+
+    def close(self):
+        if isinstance(self._chunks, mmap.mmap):
+            self._chunks.close()
+        self._chunks_file.close()
+
+    def chunk(self, i:int) -> Tuple[str, Dict[str, Any]]:
+        record = json.loads(self._chunks[self._offsets[i]:self._offsets[i + 1]])
+        return record["text"], record["metadata"]
+
+    def postings(self, word:str) -> np.ndarray:
+        # ids of the chunks that have a word equal to `word` once patched
+        i = self._word_ids.get(patch_literal(word))
+        if i is None:
+            return np.array([], dtype=np.int32)
+        return self._postings[self._postings_offsets[i]:self._postings_offsets[i + 1]]
+
+    def _has_words(self, words:List[str]) -> List[np.ndarray]:
+        # mask per word of the chunks that contain it
+        masks = []
+        for word in words:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[self.postings(word)] = True
+            masks.append(mask)
+        return masks
+
+    def candidates_for(self, constraint:Constraint, target) -> Union[np.ndarray, None]:
+        # mask of the chunks for which check(chunk, target) may hold, None if the index can't tell
+        if type(constraint) is not Constraint or constraint.input_level is None or constraint.target_level is None:
+            return None # unpickled constraints may hold None levels
+        if constraint.input_level.level is not None:
+            return None
+        level, transformation = constraint.target_level.level, constraint.transformation
+        operand, reduction = constraint.relation.operand, constraint.reduction.reduction
+        if (
+            level in _LEVELS and type(transformation) is Count and transformation.count_target is None
+            and reduction is None and type(target) is int and operand in ('==', '!=', '<', '<=', '>', '>=')
+        ):
+            return constraint.relation(self.counts[level], target) # elementwise on the array of counts
+        if level != 'word' or reduction is not None:
+            return None
+        if type(transformation) is Position and transformation.position in (0, -1) and operand == '==' and isinstance(target, str):
+            ids = self.first if transformation.position == 0 else self.last
+            word_id = self._word_ids.get(patch_literal(target))
+            return ids == word_id if word_id is not None else np.zeros(len(self), dtype=bool)
+        if type(transformation) is ForEach and transformation.func is Ellipsis and operand in ('in', 'not in'):
+            targets = target if isinstance(target, list) else [target]
+            if not all(isinstance(t, str) for t in targets):
+                return None
+            masks = self._has_words(targets)
+            if operand == 'in':
+                return np.logical_and.reduce(masks) if masks else np.ones(len(self), dtype=bool)
+            return ~np.logical_or.reduce(masks) if masks else np.ones(len(self), dtype=bool)
+        return None
+
+    def candidates(self, extractor:ConstraintExtractor) -> np.ndarray:
+        # mask of the chunks for which at least one configuration and target of extractor may hold
+        everything = np.ones(len(self), dtype=bool)
+        if extractor.target_range is None or extractor.init_modifier is not None:
+            return everything
+        extractor = extractor("")
+        mask = np.zeros(len(self), dtype=bool)
+        for constraint in extractor.constraints:
+            for target in extractor.target_range:
+                candidates = self.candidates_for(constraint, target)
+                if candidates is None:
+                    return everything
+                mask |= candidates
+        return mask
+
+    def mask(
+        self,
+        extractors:List[ConstraintExtractor],
+        conjunction:bool=True,
+        max_documents:int=None,
+        max_seq_per_document:int=None,
+    ) -> np.ndarray:
+        # chunks that may support the extractors (all of them with conjunction, any of them otherwise)
+        if self.tokenizer != get_tokenizer().name:
+            raise ValueError(f"Index was built with the {self.tokenizer} tokenizer, not {get_tokenizer().name}.")
+        masks = [self.candidates(ext) for ext in extractors]
+        mask = np.logical_and.reduce(masks) if conjunction else np.logical_or.reduce(masks)
+        if max_documents is not None:
+            mask &= self.document < max_documents
+        if max_seq_per_document is not None:
+            mask &= self.position < max_seq_per_document
+        return mask
+
+    def sequences(
+        self,
+        extractors:List[ConstraintExtractor],
+        conjunction:bool=True,
+        max_documents:int=None,
+        max_seq_per_document:int=None,
+    ) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        for i in np.flatnonzero(self.mask(extractors, conjunction, max_documents, max_seq_per_document)):
+            yield self.chunk(i)
+
+    def dispatch(self, masks:Dict[Any, np.ndarray]) -> Iterable[Tuple[str, Dict[str, Any], List[Any]]]:
+        # every chunk in any of the masks once, with the keys of the masks it is in
+        for i in np.flatnonzero(np.logical_or.reduce(list(masks.values()))):
+            yield (*self.chunk(i), [key for key, mask in masks.items() if mask[i]])
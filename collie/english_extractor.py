@@ -10,14 +10,18 @@ from .extractor_utils import TextLoader
 
 class EnglishLoader(TextLoader):
     """class for iterating over Gutenberg, dammit files.""" 
-    def __init__(self, cache_dir:str=None, randomize:bool=False, **kwargs):
+    def __init__(self, cache_dir:str=None, randomize:bool=False, seed:int=None, **kwargs):
         self.randomize = randomize
+        self.seed = seed
         self.wordlist = Path(cache_dir).joinpath("english3.txt").read_text()
 
     def __iter__(self):
-        def word_iter():
-            yield self.wordlist, dict() 
-        self._word_iter = word_iter()
+        self._start()
+        wordlist = self.wordlist
+        if self.num_shards > 1: # shards split the words of the single document
+            words = wordlist.split("\n")
+            wordlist = "\n".join(words[i] for i in sorted(self._order(len(words))))
+        self._word_iter = self._resume([(wordlist, dict())])
         return self
     
     def __next__(self):
@@ -1,10 +1,8 @@
 """Full extraction on examples"""
-import itertools
 from pathlib import Path
-from collections import defaultdict
 from typing import Dict, List, Union
 import dill
-from ..extract_constraints import FullExtractor
+from ..extract_constraints import FullExtractor, extract_sources
 from ..extractor_utils import ConstraintExtractor
 from .sent_constraints import SENT_CONSTRAINTS
 from .para_constraints import PARA_CONSTRAINTS
@@ -21,19 +19,37 @@ def extract_all(
     max_seq_per_passage:int=100,
     ex_per_constraint:int=100,
     suffix:str = "",
-    conj=True
+    conj=True,
+    cache_dir:str=None, # reuse the chunks of each source across constraints and runs
+    single_scan:bool=False, # scan each source once for all constraints, which then share the random chunks of each document
+    workers:int=1, # processes extracting sources (and their shards) concurrently
+    shards_per_source:int=1,
 ):
-    results = defaultdict(dict)
-    for (source, extractor), (constr_name, constraint) in itertools.product(
-        extractors.items(), constraints.items()
+    throughput = {}
+    for source, results, stats in extract_sources(
+        extractors,
+        constraints,
+        max_documents=max_passage,
+        max_seq_per_document=max_seq_per_passage,
+        conjunction=conj,
+        single_scan=single_scan,
+        workers=workers,
+        shards_per_source=shards_per_source,
+        cache_dir=cache_dir,
     ):
-        extractor.extract(constraint, conjunction=conj, max_documents=max_passage, max_seq_per_document=max_seq_per_passage)
-        results[source][constr_name] = extractor.get_constraints(total_examples=ex_per_constraint, conjunction=conj)
-        # extractor.inspect_results(f"temp/{source}{suffix}_dump.txt")
-    
-    for source, r in results.items():
+        # sampled and written as soon as the source is done
+        extractor, r = extractors[source], {}
+        for constr_name, result in results.items():
+            extractor.results = result
+            r[constr_name] = extractor.get_constraints(total_examples=ex_per_constraint, conjunction=conj)
         with Path(outdir).joinpath(f"{source}{suffix}.dill").open(mode="wb") as f:
             dill.dump(r, f)
+        print(
+            f"{source}{suffix}: {stats['sequences']} sequences in {stats['time']:.1f}s "
+            f"({stats['sequences_per_second'] or 0:.1f}/s), done after {stats['wall_time']:.1f}s"
+        )
+        throughput[source] = stats
+    return throughput
 
 
 if __name__ == "__main__":
@@ -1,158 +1,141 @@
-"""Datasource extractor instances"""
+"""Datasource extractor instances
+
+Loaders and extractors are built on first access, the loader of a source is shared by its passage,
+paragraph and sentence extractors so each dataset is loaded once.
+"""
+from typing import Any, Callable, Dict, Iterator
+from collections.abc import Mapping
 
 from ..extract_constraints import FullExtractor
-from ..extractor_utils import TextChunker, ConstraintExtractor
-from ..extract_constraints import FullExtractor
-from ..gutenberg_extractor import GutenbergLoader, get_gutenberg_filter, get_gutenberg_postprocessor
-from ..ccnews_extractor import CCNewsLoader, get_ccnews_filter
-from ..wiki_extractor import WikiLoader, get_wiki_filter, get_wiki_postprocessor
-from ..english_extractor import EnglishLoader
+from ..extractor_utils import TextChunker
 
 
-SOURCE_PASSAGE_EXTRACTORS = {
-    "guten": FullExtractor(
-        chunker = TextChunker(
-            paragraph_delim="\n\n",
-            postprocessor=get_gutenberg_postprocessor(),
-            filter=get_gutenberg_filter(),
-            randomize=True,
-            chunk_by_passage=True,
-        ),
-        loader = GutenbergLoader(
-            "data/gutenberg-dammit-files/gutenberg-metadata.json",
-            randomize=True
-        ),
-        metadata_fields=("Title", "Author","gd-path")
-    ),
-    "ccnews": FullExtractor(
-        chunker = TextChunker(
-            paragraph_delim="\n",
-            randomize=True,
-            filter=get_ccnews_filter(),
-            chunk_by_passage=True,
-        ),
-        loader = CCNewsLoader(
-            cache_dir="./data",
-            randomize=True
-        ),
-        metadata_fields=("index", "title")
-    ),
-    "wiki": FullExtractor(
-        chunker = TextChunker(
-            paragraph_delim="\n\n",
-            randomize=True,
-            filter=get_wiki_filter(),
-            postprocessor=get_wiki_postprocessor(),
-            chunk_by_passage=True,
-        ),
-        loader = WikiLoader(
-            cache_dir="./data",
-            randomize=True
-        ),
-        metadata_fields=("index", "title")
+class LazyRegistry(Mapping):
+    """Mapping of names to values that are built by their factory the first time they are accessed."""
+
+    def __init__(self, factories:Dict[str, Callable[[], Any]]):
+        self._factories = factories
+        self._values:Dict[str, Any] = {}
+
+    def __getitem__(self, name:str) -> Any:
+        if name not in self._values:
+            self._values[name] = self._factories[name]()
+        return self._values[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self._factories)}, built={list(self._values)})"
+
+
+# the loader modules import `datasets`, so they are only imported when a loader is built
+def _gutenberg_loader():
+    from ..gutenberg_extractor import GutenbergLoader
+    return GutenbergLoader(
+        "data/gutenberg-dammit-files/gutenberg-metadata.json",
+        randomize=True
     )
-}
 
 
-SOURCE_PARA_EXTRACTORS = {
-    "guten": FullExtractor(
-        chunker = TextChunker(
-            paragraph_delim="\n\n",
-            postprocessor=get_gutenberg_postprocessor(),
-            filter=get_gutenberg_filter(),
-            randomize=True,
-            chunk_by_sentence=False,
-        ),
-        loader = GutenbergLoader(
-            "data/gutenberg-dammit-files/gutenberg-metadata.json",
-            randomize=True
-        ),
-        metadata_fields=("Title", "Author","gd-path")
-    ),
-    "ccnews": FullExtractor(
-        chunker = TextChunker(
-            paragraph_delim="\n",
-            randomize=True,
-            filter=get_ccnews_filter(),
-            chunk_by_sentence=False,
-        ),
-        loader = CCNewsLoader(
-            cache_dir="./data",
-            randomize=True
-        ),
-        metadata_fields=("index", "title")
-    ),
-    "wiki": FullExtractor(
-        chunker = TextChunker(
-            paragraph_delim="\n\n",
-            randomize=True,
-            filter=get_wiki_filter(),
-            postprocessor=get_wiki_postprocessor(),
-            chunk_by_sentence=False,
-        ),
-        loader = WikiLoader(
-            cache_dir="./data",
-            randomize=True
-        ),
-        metadata_fields=("index", "title")
+def _ccnews_loader():
+    from ..ccnews_extractor import CCNewsLoader
+    return CCNewsLoader(
+        cache_dir="./data",
+        randomize=True
+    )
+
+
+def _wiki_loader():
+    from ..wiki_extractor import WikiLoader
+    return WikiLoader(
+        cache_dir="./data",
+        randomize=True
     )
-}
 
 
-SOURCE_SENT_EXTRACTORS = {
-    "guten": FullExtractor(
+def _english_loader():
+    from ..english_extractor import EnglishLoader
+    return EnglishLoader(
+        cache_dir="./data",
+        randomize=True
+    )
+
+
+LOADERS = LazyRegistry({
+    "guten": _gutenberg_loader,
+    "ccnews": _ccnews_loader,
+    "wiki": _wiki_loader,
+    "english": _english_loader,
+})
+
+
+def _gutenberg_extractor(**mode) -> FullExtractor:
+    from ..gutenberg_extractor import get_gutenberg_filter, get_gutenberg_postprocessor
+    return FullExtractor(
         chunker = TextChunker(
             paragraph_delim="\n\n",
             postprocessor=get_gutenberg_postprocessor(),
             filter=get_gutenberg_filter(),
             randomize=True,
-            chunk_by_sentence=True,
-        ),
-        loader = GutenbergLoader(
-            "data/gutenberg-dammit-files/gutenberg-metadata.json",
-            randomize=True
+            **mode,
         ),
+        loader = LOADERS["guten"],
         metadata_fields=("Title", "Author","gd-path")
-    ),
-    "ccnews": FullExtractor(
+    )
+
+
+def _ccnews_extractor(**mode) -> FullExtractor:
+    from ..ccnews_extractor import get_ccnews_filter
+    return FullExtractor(
         chunker = TextChunker(
             paragraph_delim="\n",
             randomize=True,
             filter=get_ccnews_filter(),
-            chunk_by_sentence=True,
-        ),
-        loader = CCNewsLoader(
-            cache_dir="./data",
-            randomize=True
+            **mode,
         ),
+        loader = LOADERS["ccnews"],
         metadata_fields=("index", "title")
-    ),
-    "wiki": FullExtractor(
+    )
+
+
+def _wiki_extractor(**mode) -> FullExtractor:
+    from ..wiki_extractor import get_wiki_filter, get_wiki_postprocessor
+    return FullExtractor(
         chunker = TextChunker(
             paragraph_delim="\n\n",
             randomize=True,
             filter=get_wiki_filter(),
             postprocessor=get_wiki_postprocessor(),
-            chunk_by_sentence=True,
-        ),
-        loader = WikiLoader(
-            cache_dir="./data",
-            randomize=True
+            **mode,
         ),
+        loader = LOADERS["wiki"],
         metadata_fields=("index", "title")
     )
-}
 
 
-SOURCE_WORD_EXTRACTORS = {
-    "english": FullExtractor(
+def _source_extractors(**mode) -> LazyRegistry:
+    return LazyRegistry({
+        "guten": lambda: _gutenberg_extractor(**mode),
+        "ccnews": lambda: _ccnews_extractor(**mode),
+        "wiki": lambda: _wiki_extractor(**mode),
+    })
+
+
+SOURCE_PASSAGE_EXTRACTORS = _source_extractors(chunk_by_passage=True)
+SOURCE_PARA_EXTRACTORS = _source_extractors(chunk_by_sentence=False)
+SOURCE_SENT_EXTRACTORS = _source_extractors(chunk_by_sentence=True)
+
+
+SOURCE_WORD_EXTRACTORS = LazyRegistry({
+    "english": lambda: FullExtractor(
         chunker = TextChunker(
             paragraph_delim="\n",
             randomize=True,
         ),
-        loader = EnglishLoader(
-            cache_dir="./data",
-            randomize=True
-        ),
+        loader = LOADERS["english"],
     )
-}
\ No newline at end of file
+})
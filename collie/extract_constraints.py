@@ -9,10 +9,18 @@ import itertools
 from tqdm.autonotebook import tqdm
 from rich import print
 import random
+import time
+import multiprocessing
+import warnings
+import copy
+import sys
 
 from .constraints import *
 from .extractor_utils import ConstraintExtractor, TextChunker, TextLoader
 from .constraint_renderer import ConstraintRenderer
+from .corpus_index import CorpusIndex
+from .chunk_cache import ChunkCache
+from .tokenizers import MemoTokenizer, get_tokenizer, set_tokenizer, preload
 
 
 @dataclass
@@ -25,27 +33,109 @@ class Support:
     metadata: dict
 
 
+class Extraction:
+    """ Supports found by a scan for one set of constraints, with the statistics of each constraint.
+    """
+    def __init__(
+        self,
+        constraints:Union[ConstraintExtractor, List[ConstraintExtractor]],
+        conjunction:bool=True,
+        adaptive:bool=True,
+        reorder_every:int=100,
+    ):
+        if not (isinstance(constraints, list) or isinstance(constraints, tuple)):
+            constraints = [constraints]
+        self.constraints = constraints
+        self.conjunction = conjunction
+        self.adaptive = adaptive
+        self.reorder_every = reorder_every
+        self.results:Dict[str,List[List[Support]]] = defaultdict(lambda: [[] for _ in range(len(constraints))])
+        self.stats:List[Dict[str, Any]] = [
+            {"calls": 0, "passed": 0, "prefiltered": 0, "time": 0.0} for _ in range(len(constraints))
+        ] # per constraint: calls, passed and time
+        self.order:List[int] = list(range(len(constraints))) # order in which constraints are evaluated
+        self.num_seqs = 0
+
+    def reorder(self):
+        # ascending expected time spent per rejected sequence, constraints never run go first
+        def cost(i):
+            stats = self.stats[i]
+            if not stats["calls"]:
+                return 0.0
+            return stats["time"] / max(stats["calls"] - stats["passed"], 1e-3)
+        self.order = sorted(self.order, key=cost)
+
+    def extract_all(self, seq:str):
+        # results of every extractor on seq, each computed once. None if conjunction and an extractor
+        # has no satisfying configuration, in which case the remaining ones are not run
+        conjunction = self.conjunction and len(self.constraints) > 1
+        extractors = [ext(seq) for ext in self.constraints]
+        if conjunction:
+            # reject with the cheap necessary conditions of all constraints before tokenizing
+            for i in self.order:
+                if not extractors[i].prefilter():
+                    self.stats[i]["prefiltered"] += 1
+                    return None
+        results = [None] * len(extractors)
+        for i in self.order:
+            start = time.perf_counter()
+            result = list(extractors[i])
+            passed = any(sat for sat, _ in result)
+            stats = self.stats[i]
+            stats["time"] += time.perf_counter() - start
+            stats["calls"] += 1
+            stats["passed"] += passed
+            if conjunction and not passed:
+                return None
+            results[i] = result
+        return results
+
+    def add(self, seq:str, metadata:dict):
+        self.num_seqs += 1
+        if self.conjunction and self.adaptive and self.num_seqs % self.reorder_every == 0:
+            self.reorder()
+        # with conjunction, all constraints need a target that works with this seq
+        results = self.extract_all(seq)
+        if results is None:
+            return
+        for i, result in enumerate(results):
+            for sat, (constraint, target) in result:
+                if not sat: continue
+                self.results[seq][i].append(
+                    Support(
+                        constraint=constraint,
+                        target=target,
+                        example=seq,
+                        metadata=metadata
+                    )
+                )
+
+
 class FullExtractor:
     """ Full end-to-end constraint extraction, including prompt rendering and writing/formatting results.
     """
     def __init__(self,
         chunker:TextChunker,
         loader:TextLoader,
-        metadata_fields:Iterable=None
+        metadata_fields:Iterable=None,
+        cache_dir:str=None, # if set, chunks are read from (and first written to) a ChunkCache there
     ):
         self.chunker = chunker
         self.loader = loader 
         self.metadata_fields = metadata_fields
+        self.cache_dir = cache_dir
+        self.num_seqs = 0 # sequences scanned by the last extract
         self.results:Dict[str,List[List[Support]]] = None # [example][constraint_idx][support_idx]
+        self._stats:List[Dict[str, Any]] = [] # per constraint: calls, passed and time
+        self._order:List[int] = [] # order in which constraints are evaluated
 
-    def _all_sat(self, extractor, seq):
-        # check that all extractors have at least one satisfying configuration
-        if len(extractor) == 1:
-            return True
-        for ext in extractor:
-            if not any([x[0] for x in ext(seq)]):
-                return False
-        return True
+    def constraint_stats(self) -> List[Dict[str, Any]]:
+        # per constraint of the last extract: sequences checked, pass rate, time and sequences rejected
+        # by its prefilter
+        return [
+            {**stats, "pass_rate": stats["passed"] / stats["calls"] if stats["calls"] else None}
+            for stats in self._stats
+        ]
  
     def extract(
         self,
@@ -53,11 +143,63 @@ class FullExtractor:
         max_documents:int=None,
         max_seq_per_document:int=None,
         conjunction:bool=True, # if set to True, every Support requires all constraints to have at least one satisfied target.
+        adaptive:bool=True, # with conjunction, periodically run the cheapest and most selective constraints first
+        reorder_every:int=100,
+        index:CorpusIndex=None, # if given, only the candidate chunks of the index are checked instead of the loader's
     ):
-        if not (isinstance(constraints, list) or isinstance(constraints, tuple)):
-            constraints = [constraints]
+        extraction = self.extract_many(
+            {None: constraints}, max_documents, max_seq_per_document, conjunction, adaptive, reorder_every, index
+        )[None]
+        self.results, self._stats, self._order = extraction.results, extraction.stats, extraction.order
+
+    def extract_many(
+        self,
+        constraints:Dict[str, Union[ConstraintExtractor, List[ConstraintExtractor]]],
+        max_documents:int=None,
+        max_seq_per_document:int=None,
+        conjunction:bool=True,
+        adaptive:bool=True,
+        reorder_every:int=100,
+        index:CorpusIndex=None,
+    ) -> Dict[str, "Extraction"]:
+        # same as calling extract for every entry of constraints, but the corpus is scanned once and every
+        # sequence is checked by all entries in turn, so its tokenization is shared between them. With a
+        # randomized chunker all entries see the same random chunks of a document, where separate extract
+        # calls each draw their own
+        extractions = {
+            name: Extraction(constraint, conjunction, adaptive, reorder_every) for name, constraint in constraints.items()
+        }
+        if index is not None:
+            masks = {
+                name: index.mask(extraction.constraints, conjunction, max_documents, max_seq_per_document)
+                for name, extraction in extractions.items()
+            }
+            seqs = tqdm(index.dispatch(masks), leave=False)
+        else:
+            seqs = ((seq, metadata, extractions) for seq, metadata in self._sequences(max_documents, max_seq_per_document))
+        tokenizer = get_tokenizer()
+        memo = tokenizer if isinstance(tokenizer, MemoTokenizer) else MemoTokenizer(tokenizer)
+        set_tokenizer(memo)
+        self.num_seqs = 0
+        try:
+            for seq, metadata, names in seqs:
+                self.num_seqs += 1
+                for name in names:
+                    extractions[name].add(seq, metadata)
+        finally:
+            if get_tokenizer() is memo:
+                set_tokenizer(tokenizer)
+        return extractions
 
-        self.results = defaultdict(lambda: [[] for _ in range(len(constraints))])
+    def _sequences(self, max_documents:int=None, max_seq_per_document:int=None):
+        # (chunk, metadata) of the documents of the loader
+        if self.cache_dir is not None:
+            cache = ChunkCache.get(self.cache_dir, self.loader, self.chunker, max_documents, max_seq_per_document, self.metadata_fields)
+            try:
+                yield from tqdm(cache, total=len(cache), leave=False)
+            finally:
+                cache.close()
+            return
         passage_iter = itertools.islice(self.loader, 0, max_documents) if max_documents is not None else self.loader
         for passage, metadata in tqdm(passage_iter, total=max_documents, leave=False):
             if self.metadata_fields is not None:
@@ -66,21 +208,11 @@ class FullExtractor:
                 self.chunker(passage), 0, max_seq_per_document
             ) if max_seq_per_document is not None else self.chunker(passage)
             for seq in seq_iter:
-                # first check that all constraints has a target that works with this seq
-                if conjunction and not self._all_sat(constraints, seq):
-                    continue
+                yield seq, metadata
 
-                for i, ext in enumerate(constraints):
-                    for sat, (constraint, target) in ext(seq):
-                        if not sat: continue
-                        self.results[seq][i].append(
-                            Support(
-                                constraint=constraint,
-                                target=target,
-                                example=seq,
-                                metadata=metadata
-                            )
-                        )
+    def build_index(self, path:str, max_documents:int=None, max_seq_per_document:int=None) -> CorpusIndex:
+        # index the chunks of the loader, to extract from them with extract(..., index=)
+        return CorpusIndex.build(path, self.loader, self.chunker, max_documents, max_seq_per_document, self.metadata_fields)
 
     def save(self, filepath:str):
         with Path(filepath).open(mode="wb") as f:
@@ -170,3 +302,137 @@ class FullExtractor:
         raise NotImplementedError
         results = self.get_constraints(total_examples=total_examples, conjunction=conjunction)
         Path(file).write_text(results) 
+
+
+_jobs:Dict[str, Any] = {} # extractors, constraints and options of extract_sources, inherited by forked workers
+
+
+def _merge_results(results:Dict[str, List[List[Support]]], other:Dict[str, List[List[Support]]]):
+    # add the supports of other to results, a sequence found in both keeps the supports of both
+    for seq, supports in other.items():
+        if seq not in results:
+            results[seq] = supports
+            continue
+        for merged, new in zip(results[seq], supports):
+            merged.extend(new)
+
+
+def _fork_context():
+    # start context of the workers, None where forking isn't available (Windows) or isn't safe (macOS)
+    if sys.platform == "darwin" or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def _extract_shard(job):
+    # supports per constraint name of one shard of a source
+    source, shard, num_shards, seed = job
+    extractor, constraints, options = _jobs["extractors"][source], _jobs["constraints"], _jobs["options"]
+    if options["cache_dir"] is not None:
+        extractor = copy.copy(extractor) # leave the cache_dir of the caller's extractor alone
+        extractor.cache_dir = options["cache_dir"]
+    max_documents = options["max_documents"]
+    if num_shards > 1:
+        if extractor.loader.seed is None:
+            extractor.loader.seed = seed # every shard must split the same order
+        extractor.loader.shard(num_shards, shard)
+        if max_documents is not None:
+            max_documents = max_documents // num_shards + (shard < max_documents % num_shards)
+    kwargs = dict(
+        max_documents=max_documents,
+        max_seq_per_document=options["max_seq_per_document"],
+        conjunction=options["conjunction"],
+    )
+    start = time.perf_counter()
+    if options["single_scan"]:
+        extractions = extractor.extract_many(constraints, **kwargs)
+        results = {name: dict(extraction.results) for name, extraction in extractions.items()}
+        num_seqs = extractor.num_seqs
+    else:
+        results, num_seqs = {}, 0
+        for name, constraint in constraints.items():
+            extractor.extract(constraint, **kwargs)
+            results[name] = dict(extractor.results)
+            num_seqs += extractor.num_seqs
+    return source, results, num_seqs, time.perf_counter() - start
+
+
+def _extract_shard_serialized(job):
+    # _extract_shard in a worker, the results are dill serialized since they hold constraints
+    source, results, num_seqs, seconds = _extract_shard(job)
+    return source, dill.dumps(results), num_seqs, seconds
+
+
+def extract_sources(
+    extractors:Dict[str, FullExtractor],
+    constraints:Dict[str, Union[ConstraintExtractor, List[ConstraintExtractor]]],
+    max_documents:int=None,
+    max_seq_per_document:int=None,
+    conjunction:bool=True,
+    single_scan:bool=False,
+    workers:int=1,
+    shards_per_source:int=1,
+    cache_dir:str=None,
+) -> Iterable:
+    """
+    Extracts constraints from every source, yielding (source, results per constraint name, throughput)
+    as soon as a source is done.
+
+    With workers > 1 the sources run in a pool of forked processes, each source split in
+    `shards_per_source` shards of its loader that share max_documents, so workers inherit the
+    extractors instead of pickling them. Sharding a randomized loader without a seed fixes a random seed.
+    With single_scan, every source is scanned once for all constraints (see FullExtractor.extract_many),
+    so they share the random chunks drawn from each document instead of drawing their own.
+    Where processes can't be forked the sources are extracted one after the other in this process.
+    If cache_dir is given, the chunks of every source are read from a ChunkCache there.
+    """
+    context = _fork_context() if workers > 1 else None
+    if workers > 1 and context is None:
+        warnings.warn(f"forking is not available on {sys.platform}, extracting the sources serially")
+        workers = 1
+    if workers <= 1:
+        shards_per_source = 1
+    jobs = []
+    for source, extractor in extractors.items():
+        num_shards = shards_per_source if isinstance(extractor.loader, TextLoader) else 1
+        seed = random.getrandbits(32)
+        jobs.extend((source, shard, num_shards, seed) for shard in range(num_shards))
+    remaining = {source: sum(job[0] == source for job in jobs) for source in extractors}
+    merged = {source: {name: {} for name in constraints} for source in extractors}
+    throughput = {source: {"sequences": 0, "time": 0.0} for source in extractors}
+
+    _jobs.update(
+        extractors=extractors,
+        constraints=constraints,
+        options=dict(
+            max_documents=max_documents,
+            max_seq_per_document=max_seq_per_document,
+            conjunction=conjunction,
+            single_scan=single_scan,
+            cache_dir=cache_dir,
+        ),
+    )
+    if workers > 1:
+        preload() # inherited by the workers
+    pool = context.Pool(workers) if workers > 1 else None
+    try:
+        done = pool.imap_unordered(_extract_shard_serialized, jobs) if pool is not None else map(_extract_shard, jobs)
+        start = time.perf_counter()
+        for source, results, num_seqs, seconds in done:
+            if pool is not None:
+                results = dill.loads(results)
+            for name, result in results.items():
+                _merge_results(merged[source][name], result)
+            throughput[source]["sequences"] += num_seqs
+            throughput[source]["time"] += seconds
+            remaining[source] -= 1
+            if remaining[source]:
+                continue
+            stats = throughput[source]
+            stats["wall_time"] = time.perf_counter() - start
+            stats["sequences_per_second"] = stats["sequences"] / stats["time"] if stats["time"] else None
+            yield source, merged.pop(source), stats
+    finally:
+        _jobs.clear()
+        if pool is not None:
+            pool.terminate()
@@ -1,13 +1,15 @@
 """Code for preprocessing text"""
 import copy
-from typing import Type, Iterable, Callable, Dict, Any, Tuple
+from typing import Type, Iterable, Callable, Dict, Any, Tuple, List
 import random
 from collections import OrderedDict, defaultdict
 import re
 import functools
 import itertools
-import nltk
+import time
+import threading
 from .constraints import *
+from .tokenizers import get_punkt, sent_tokenize
 
 
 # useful for post_extract lambdas in ConstraintExtractor.
@@ -15,27 +17,54 @@ def raise_exception():
     raise Exception()
 
 
+class Substitution:
+    """A precompiled re.sub pass, skipped when the text contains none of `triggers`.
+
+    `bulk_pattern` is the variant run on all paragraphs joined by `Processor.bulk_sep` at once, it
+    must not match across the separator. Without it the pass runs on each paragraph in bulk mode.
+    """
+    def __init__(self, pattern:str, repl:str, triggers:str=None, bulk_pattern:str=None):
+        self.pattern = re.compile(pattern)
+        self.bulk_pattern = re.compile(bulk_pattern) if bulk_pattern is not None else None
+        self.repl = repl
+        self.triggers = triggers
+
+    def __call__(self, text:str, bulk:bool=False) -> str:
+        if self.triggers is not None and not any(c in text for c in self.triggers):
+            return text
+        return (self.bulk_pattern if bulk else self.pattern).sub(self.repl, text)
+
+
+_markdown = Substitution(r'(\*\*|__|\*|_|\~\~)(.*?)\1', r'\2', triggers="*_~")
+_consecutive_whitespace = Substitution(r'\s\s+', ' ', bulk_pattern=r'\s\s+')
+_singlenewline = Substitution(r"(?<!\n)\n(?!\n)", " ", triggers="\n", bulk_pattern=r"(?<!\n)\n(?!\n)")
+_references = Substitution(r'\[\d+\]', '', triggers="[", bulk_pattern=r'\[\d+\]')
+_brackets = Substitution(r'\[[^\]]*\]', '', triggers="[", bulk_pattern=r'\[[^\]\x00]*\]')
+# after the whitespace pass every newline left is a single one
+_newline = Substitution(r"\n", " ", triggers="\n", bulk_pattern=r"\n")
+
+
 # Functions for TextChunker postprocessor/preprocessor arguments
 def markdown_remover(text:str) -> str:
-    return re.sub(r'(\*\*|__|\*|_|\~\~)(.*?)\1', r'\2', text)
+    return _markdown(text)
 
 
 def consecutive_whitespace_remover(text:str) -> str:
-    return re.sub(r'\s{2,}', ' ', text)
+    return _consecutive_whitespace(text)
 
 
 def replace_singlenewline_with_space(text:str) -> str:
-    return re.sub(r"(?<!\n)\n(?!\n)", " ", text)
+    return _singlenewline(text)
 
 
 def remove_references(text:str) -> str:
     # remove things like [23]
-    return re.sub(r'\[\d+\]', '', text)
+    return _references(text)
 
 
 def remove_brackets(text:str) -> str:
     # remove anything between two square brackets.
-    return re.sub(r'\[[^\]]*\]', '', text)
+    return _brackets(text)
 
 
 def chain_processors(*funcs:Iterable[Callable[[str], str]]) -> Callable[[str], str]:
@@ -43,21 +72,83 @@ def chain_processors(*funcs:Iterable[Callable[[str], str]]) -> Callable[[str], s
     return functools.reduce(compose, funcs) # apply compose to all funcs
 
 
+_substitutions = {
+    markdown_remover: _markdown,
+    consecutive_whitespace_remover: _consecutive_whitespace,
+    replace_singlenewline_with_space: _singlenewline,
+    remove_references: _references,
+    remove_brackets: _brackets,
+}
+# cheaper equivalents of consecutive passes (in order of application)
+_simplified = {
+    (_consecutive_whitespace, _singlenewline): (_consecutive_whitespace, _newline),
+}
+
+
+class Processor:
+    """Same result as chain_processors(*funcs), with the known processors replaced by their
+    precompiled substitutions and consecutive ones simplified.
+
+    `bulk` processes all paragraphs of a document at once.
+    """
+    bulk_sep = "\x00"
+
+    def __init__(self, *funcs:Callable[[str], str]):
+        self.passes = []
+        for f in reversed(funcs): # chain_processors applies the last function first
+            step = _substitutions.get(f, f)
+            if self.passes and (self.passes[-1], step) in _simplified:
+                self.passes.extend(_simplified[(self.passes.pop(), step)])
+            else:
+                self.passes.append(step)
+
+    def __call__(self, text:str) -> str:
+        for step in self.passes:
+            text = step(text)
+        return text
+
+    def bulk(self, texts:Iterable[str]) -> List[str]:
+        texts = list(texts)
+        if any(self.bulk_sep in t for t in texts):
+            return [self(t) for t in texts]
+        joined = None
+        for step in self.passes:
+            if isinstance(step, Substitution) and step.bulk_pattern is not None:
+                if joined is None:
+                    joined = self.bulk_sep.join(texts)
+                joined = step(joined, bulk=True)
+            else:
+                if joined is not None:
+                    texts, joined = joined.split(self.bulk_sep), None
+                texts = [step(t) for t in texts]
+        return texts if joined is None else joined.split(self.bulk_sep)
+
+
+def compile_processors(*funcs:Iterable[Callable[[str], str]]) -> Processor:
+    return Processor(*funcs)
+
+
 # Functions for TextChunker filter argument
 def all_caps_filter(text:str) -> bool:
     # return True if text is all caps
     return text.upper() == text
 
 
+# Urls are matched by (http(s)?://)?(www\.)?[a-zA-Z0-9\-]+\.[a-zA-Z]{2,6}(\.[a-zA-Z]{2,6})?(/[a-zA-Z0-9\-]*)*(\?[a-zA-Z0-9\-=&]*)?
+# everything but the domain is optional, so a text has a match iff it has a match of the domain core.
+_url_pattern = re.compile(r"[a-zA-Z0-9\-]\.[a-zA-Z]{2}")
+
+
 def url_filter(text:str) -> bool:
     # return True if there is a url in the text
-    pattern = re.compile(r"(http(s)?://)?(www\.)?[a-zA-Z0-9\-]+\.[a-zA-Z]{2,6}(\.[a-zA-Z]{2,6})?(/[a-zA-Z0-9\-]*)*(\?[a-zA-Z0-9\-=&]*)?")
-    return bool(re.findall(pattern, text))
+    return _url_pattern.search(text) is not None
 
 
 def no_sents_filter(text:str) -> bool:
     # returns true if no sentence is detected in the text
-    for s in nltk.sent_tokenize(text):
+    if "." not in text or len(text.split()) <= 2: # no sentence can pass the checks below
+        return True
+    for s in sent_tokenize(text):
         if "." in s and len(s.split()) > 2: # could be a sentence
             return False
     return True
@@ -73,9 +164,96 @@ def caption_filter(text:str) -> bool:
     return len(text.split(":")[0].split()) <= 5 
 
 
+class FilterChain:
+    """Rejects a text if any of its filters does, stopping at the first filter that rejects it.
+
+    Every filter's calls, rejections and time are recorded, and with adaptive=True the filters are
+    reordered every `reorder_every` texts so that the ones with the lowest time per rejection run first.
+    Copies made by `copy()` keep their own stats, which are also added to this chain's.
+    """
+    def __init__(self, *funcs:Callable[[str], bool], adaptive:bool=True, reorder_every:int=1000):
+        self.funcs = list(funcs)
+        self.adaptive = adaptive
+        self.reorder_every = reorder_every
+        self.order = list(range(len(self.funcs)))
+        self._parent = None # chain whose stats are aggregated, and whose order is used
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def copy(self) -> "FilterChain":
+        # the same filters with their own stats, for a chunker copy
+        chain = copy.copy(self)
+        chain._parent = self if self._parent is None else self._parent
+        chain._lock = threading.Lock()
+        chain.reset_stats()
+        return chain
+
+    def __call__(self, text:str) -> bool:
+        root = self if self._parent is None else self._parent
+        times = [] # seconds of every filter run, in order
+        rejected = False
+        order = root.order
+        for i in order:
+            start = time.perf_counter()
+            rejected = self.funcs[i](text)
+            times.append(time.perf_counter() - start)
+            if rejected:
+                break
+        self._count(order, times, rejected)
+        if root is not self:
+            root._count(order, times, rejected)
+        return bool(rejected)
+
+    def _count(self, order:List[int], times:List[float], rejected:bool):
+        with self._lock:
+            self.total += 1
+            for i, seconds in zip(order, times):
+                self.time[i] += seconds
+                self.calls[i] += 1
+            if rejected:
+                self.rejected[order[len(times) - 1]] += 1
+            if self._parent is None and self.adaptive and (self.total + 1) % self.reorder_every == 0:
+                self.reorder() # before every reorder_every-th text
+
+    def reorder(self):
+        # ascending expected time spent per rejected text, filters never run keep their place
+        def cost(i):
+            if not self.calls[i]:
+                return 0.0
+            return self.time[i] / max(self.rejected[i], 1e-3)
+        # a new list, so that threads sharing the chain keep iterating a complete order
+        self.order = sorted(self.order, key=cost)
+
+    def reset_stats(self):
+        self.total = 0
+        self.calls = [0] * len(self.funcs)
+        self.rejected = [0] * len(self.funcs)
+        self.time = [0.0] * len(self.funcs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        # per filter, in the current order
+        return {
+            getattr(self.funcs[i], "__name__", repr(self.funcs[i])): {
+                "calls": self.calls[i],
+                "rejected": self.rejected[i],
+                "time": self.time[i],
+            }
+            for i in self.order
+        }
+
+
 def chain_filters(*funcs:Iterable[Callable[[str], bool]]) -> Callable[[str], bool]:
     # chain multiple filters together to make new function
-    return lambda text: any([f(text) for f in funcs])
+    return FilterChain(*funcs)
 
 
 # Functions for ConstraintExtractor init_modifier argument
@@ -89,6 +267,19 @@ def add_units_to_count(init_range, text):
 
 
 class TextLoader(Iterable):
+    """Base class for loaders. Subclasses iterate over `_order(n)` through `_resume` after calling
+    `_start()` in `__iter__`, which gives them deterministic sharding and resumable iteration.
+    """
+    randomize:bool = False
+    seed:int = None
+    num_shards:int = 1
+    shard_index:int = 0
+    cache_key:str = None # identifies the documents in chunk caches, instead of the public attributes
+    _state_attributes:Tuple[str, ...] = () # public attributes that are iteration state, not settings
+    _state:dict = None # loaded state, used by the next __iter__
+    _iter_seed:int = None
+    _position:int = 0
+
     def __iter__(self):
         return self
     
@@ -98,7 +289,156 @@ class TextLoader(Iterable):
     
     def __len__(self):
         raise NotImplementedError
-    
+
+    def shard(self, num_shards:int, index:int) -> "TextLoader":
+        # only iterate over every num_shards-th item of the (seeded) order, starting at index
+        if not 0 <= index < num_shards:
+            raise ValueError(f"Shard index {index} out of range for {num_shards} shards.")
+        self.num_shards, self.shard_index = num_shards, index
+        return self
+
+    def state_dict(self) -> Dict[str, Any]:
+        # position is the number of items of this shard consumed in the current iteration
+        return {
+            "num_shards": self.num_shards,
+            "shard_index": self.shard_index,
+            "seed": self._iter_seed,
+            "position": self._position,
+        }
+
+    def load_state_dict(self, state:Dict[str, Any]):
+        # the next iteration continues where the iteration that produced state stopped
+        self.shard(state["num_shards"], state["shard_index"])
+        self._state = dict(state)
+
+    def _start(self):
+        # begin an iteration, resuming from a loaded state if there is one
+        state, self._state = self._state, None
+        if state is not None:
+            self._iter_seed, self._position = state["seed"], state["position"]
+            return
+        self._iter_seed, self._position = self.seed, 0
+        if self.randomize and self.seed is None:
+            if self.num_shards > 1:
+                raise ValueError("Sharding a randomized loader requires a seed.")
+            self._iter_seed = random.getrandbits(32)
+
+    def _order(self, n:int) -> List[int]:
+        # indices of the items of this shard, in iteration order
+        order = list(range(n))
+        if self.randomize:
+            random.Random(self._iter_seed).shuffle(order)
+        return order[self.shard_index::self.num_shards]
+
+    def _resume(self, items:Iterable) -> Iterable:
+        # skip the items consumed before and count the ones consumed now
+        for item in itertools.islice(items, self._position, None):
+            self._position += 1
+            yield item
+
+
+class DatasetLoader(TextLoader):
+    """Iterates over the rows of a HuggingFace Dataset with a text column.
+
+    With streaming=True the underlying Arrow table is read in record batches holding only the text
+    and `columns` fields, and randomize shuffles the batch order and the rows within a buffer of
+    `buffer_size` rows instead of accessing the rows in a random order one by one.
+    """
+    text_column = "text"
+    _state_attributes = ("indices",)
+
+    def __init__(
+        self,
+        dataset,
+        randomize:bool=False,
+        streaming:bool=False,
+        columns:Iterable[str]=None,
+        batch_size:int=1000,
+        buffer_size:int=10000,
+        seed:int=None,
+    ):
+        self.dataset = dataset
+        self.randomize = randomize
+        self.streaming = streaming
+        self.columns = columns
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.seed = seed
+        self.indices:List = None
+
+    def __iter__(self):
+        self._start()
+        if self.streaming:
+            self._metadata_iter = self._resume(self._stream_rows())
+            return self
+        self.indices = self._order(len(self.dataset))
+        def metadata_iter():
+            for idx in self._resume(self.indices):
+                datadict = self.dataset[idx] # a new dict for every access
+                txt = datadict.pop(self.text_column)
+                datadict["index"] = idx
+                yield txt, datadict
+        self._metadata_iter = metadata_iter()
+        return self
+
+    def _stream_rows(self) -> Iterable[Tuple[str, dict]]:
+        names = self.dataset.column_names if self.columns is None else self.columns
+        fields = [c for c in names if c in self.dataset.column_names and c != self.text_column]
+        table = self.dataset.with_format("arrow", columns=[self.text_column] + fields)
+        starts = list(range(0, len(table), self.batch_size))
+        rng = random.Random(self._iter_seed)
+        if self.randomize:
+            rng.shuffle(starts)
+        starts = starts[self.shard_index::self.num_shards] # shards are sets of batches
+        buffer = []
+        for start in starts:
+            batch = table[start:start + self.batch_size] # zero-copy slice
+            texts = batch.column(self.text_column).to_pylist()
+            values = [batch.column(c).to_pylist() for c in fields]
+            for i, txt in enumerate(texts):
+                metadata = {c: v[i] for c, v in zip(fields, values)}
+                metadata["index"] = start + i
+                if not self.randomize:
+                    yield txt, metadata
+                elif len(buffer) < self.buffer_size:
+                    buffer.append((txt, metadata))
+                else: # emit a random buffered row and keep the new one in its place
+                    j = rng.randrange(len(buffer))
+                    yield buffer[j]
+                    buffer[j] = (txt, metadata)
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def __next__(self):
+        txt, meta = next(self._metadata_iter)
+        return txt, meta
+
+    def __len__(self):
+        return len(self.dataset)
+
+
+def random_order(items:List[Any]) -> Iterable[Any]:
+    # lazy Fisher-Yates shuffle of a copy of items
+    items = list(items)
+    for i in range(len(items)):
+        j = random.randrange(i, len(items))
+        items[i], items[j] = items[j], items[i]
+        yield items[i]
+
+
+def shuffle_buffer(items:Iterable[Any], size:int) -> Iterable[Any]:
+    # approximate shuffle holding at most `size` items
+    buffer = []
+    for item in items:
+        if len(buffer) < size:
+            buffer.append(item)
+            continue
+        j = random.randrange(size)
+        yield buffer[j]
+        buffer[j] = item
+    random.shuffle(buffer)
+    yield from buffer
+
 
 class TextChunker(Iterable):
     """Iterable class for chunking text returned by a TextLoader"""
@@ -111,6 +451,8 @@ class TextChunker(Iterable):
         randomize:bool=False,
         chunk_by_sentence:bool=False,
         chunk_by_passage:bool=False,
+        lazy:bool=False,
+        buffer_size:int=16,
     ):
         self.paragraph_delim = paragraph_delim
         self.preprocessor = preprocessor
@@ -123,44 +465,131 @@ class TextChunker(Iterable):
         assert not (chunk_by_passage and chunk_by_sentence)
         self.chunk_by_sentence = chunk_by_sentence
         self.chunk_by_passage = chunk_by_passage
+        # lazy: chunk on demand, randomizing with a shuffle buffer of buffer_size chunks
+        self.lazy = lazy
+        self.buffer_size = buffer_size
         self.rejected, self.total = 0.0, 0.0
+        self._parent = None # chunker whose stats are aggregated
+        self._lock = threading.Lock()
         if self.chunk_by_sentence:
-            nltk.download("punkt") 
-
-    def __call__(self, text):
-        self.text = self.preprocessor(text)
-        return self
+            get_punkt() # fail early if the sentence model is not installed
+
+    def __call__(self, text) -> "TextChunker":
+        # an independent chunker over text, whose stats are also added to this chunker's
+        chunks = copy.copy(self)
+        chunks.text = self.preprocessor(text)
+        chunks._parent = self if self._parent is None else self._parent
+        if isinstance(self.filter, FilterChain):
+            chunks.filter = self.filter.copy()
+        chunks._seq_iter, chunks._len = None, None
+        chunks.rejected, chunks.total = 0.0, 0.0
+        return chunks
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
     
     @property
     def percent_rejected(self):
         return self.rejected / self.total
     
     def reset_stats(self):
-        self.rejected, self.total = 0.0, 0.0
+        with self._lock:
+            self.rejected, self.total = 0.0, 0.0
+
+    def _count(self, total:int, rejected:int):
+        self.total += total
+        self.rejected += rejected
+        if self._parent is not None:
+            with self._parent._lock:
+                self._parent.total += total
+                self._parent.rejected += rejected
     
-    def _get_passage_chunks(self, paragraphs:Iterable[str]) -> Iterable[str]:
+    def _postprocess(self, paragraphs:List[str]) -> List[str]:
+        bulk = getattr(self.postprocessor, "bulk", None)
+        if bulk is not None:
+            return bulk(paragraphs)
+        return [self.postprocessor(p) for p in paragraphs]
+
+    def _passage_groups(self, paragraphs:Iterable[str], end:int=None, filtered:Dict[int, bool]=None) -> Iterable[List[str]]:
+        # groups of paragraphs that make passages, `end` is the position of the document end when
+        # the paragraphs are rotated, `filtered` the filter results already known by position
         buffer = [] # list of paragraphs, that may be added to passages
-        passages = [] # list of passages
-        for p in paragraphs:
-            if self.filter(p): # did not make the cut
-                self.total += 1
+        for i, p in enumerate(paragraphs):
+            if i == end and len(buffer) > 2: # catch last group of paragraphs
+                yield buffer
+            if i == end:
+                buffer = []
+            if filtered[i] if filtered is not None and i in filtered else self.filter(p): # did not make the cut
                 if len(buffer) > 2: # see if we should add buffer to passages
-                    passages.append(Level.join_paragraphs(buffer))
+                    self._count(1, 0)
+                    yield buffer
                 else:
-                    self.rejected += 1
+                    self._count(1, 1)
                 buffer = []
             else: # paragraph not filtered so add it to the buffer
-                buffer.append(self.postprocessor(p))
+                buffer.append(p)
         if len(buffer) > 2: # catch last group of paragraphs
-            passages.append(Level.join_paragraphs(buffer))
-        return passages
-    
+            yield buffer
+
+    def _get_passage_chunks(self, paragraphs:Iterable[str]) -> Iterable[str]:
+        groups = list(self._passage_groups(paragraphs))
+        # postprocess the paragraphs of all passages at once
+        processed = iter(self._postprocess([p for group in groups for p in group]))
+        return [Level.join_paragraphs([next(processed) for _ in group]) for group in groups]
+
+    def _split(self) -> Iterable[str]:
+        # same as re.split(self.paragraph_delim, self.text), one paragraph at a time
+        start = 0
+        for m in re.finditer(self.paragraph_delim, self.text):
+            yield self.text[start:m.start()]
+            start = m.end()
+        yield self.text[start:]
+
+    def _lazy_chunks(self) -> Iterable[str]:
+        if not self.randomize:
+            paragraphs = self._split()
+            if self.chunk_by_sentence:
+                return (s for p in paragraphs for s in sent_tokenize(p))
+            if self.chunk_by_passage:
+                return self._lazy_passages(paragraphs)
+            return paragraphs
+        paragraphs = re.split(self.paragraph_delim, self.text)
+        if self.chunk_by_sentence:
+            return shuffle_buffer((s for p in random_order(paragraphs) for s in sent_tokenize(p)), self.buffer_size)
+        if self.chunk_by_passage:
+            # passages can't be reordered, so start from the passage boundary after a random paragraph
+            n = len(paragraphs)
+            scanned = {} # filter results of the paragraphs scanned for the boundary, reused for the passages
+            for i in range(random.randrange(n), n):
+                scanned[i] = self.filter(paragraphs[i])
+                if scanned[i]:
+                    break
+            start = (i + 1) % n if scanned[i] else 0
+            rotated = paragraphs[start:] + paragraphs[:start]
+            filtered = {(i - start) % n: rejected for i, rejected in scanned.items()}
+            return shuffle_buffer(self._lazy_passages(rotated, end=n - start, filtered=filtered), self.buffer_size)
+        return random_order(paragraphs)
+
+    def _lazy_passages(self, paragraphs:Iterable[str], end:int=None, filtered:Dict[int, bool]=None) -> Iterable[str]:
+        for group in self._passage_groups(paragraphs, end=end, filtered=filtered):
+            yield Level.join_paragraphs(self._postprocess(group))
+
     def __iter__(self):
+        if self.lazy:
+            self._len = None
+            self._seq_iter = self._lazy_chunks()
+            return self
         paragraphs = re.split(self.paragraph_delim, self.text)
         if self.chunk_by_sentence:
             sequences = []
             for chunk in paragraphs:
-                sequences.extend(nltk.sent_tokenize(chunk))
+                sequences.extend(sent_tokenize(chunk))
         elif self.chunk_by_passage:
             sequences = self._get_passage_chunks(paragraphs)
         else:
@@ -182,11 +611,12 @@ class TextChunker(Iterable):
         while not seq or self.filter(seq):
             seq = next(self._seq_iter)
             total += 1
-        self.total += total 
-        self.rejected += total - 1
+        self._count(total, total - 1)
         return self.postprocessor(seq)
 
     def __len__(self):
+        if self._len is None:
+            raise TypeError("length of a lazy TextChunker is unknown")
         return self._len 
 
 
@@ -218,37 +648,58 @@ class ConstraintExtractor(Iterable):
         self.init_range = None # can change on each __call__ 
         self.target_range = target_range
         self._combined_iter = None
+        self._constraints = None # built once per __call__
         self.post_extract = post_extract
         self.init_modifier = init_modifier
 
-    def __call__(self, text):
-        self.text = text
+    def __call__(self, text) -> "ConstraintExtractor":
+        # an independent extractor over text
+        extractor = copy.copy(self)
+        extractor.text = text
         if self.init_modifier is not None:
-            self.init_range = self.init_modifier(copy.deepcopy(self._init_range), text)
+            extractor.init_range = self.init_modifier(copy.deepcopy(self._init_range), text)
         else:
-            self.init_range = self._init_range
-        return self
+            extractor.init_range = self._init_range
+        extractor._combined_iter = None
+        extractor._constraints = None
+        return extractor
+
+    @property
+    def constraints(self) -> List[Constraint]:
+        # one constraint per configuration of init_range
+        if self._constraints is None:
+            keys = list(self.init_range.keys())
+            self._constraints = [self.ConstraintCls(**dict(zip(keys, vals))) for vals in itertools.product(*self.init_range.values())]
+        return self._constraints
+
+    def prefilter(self) -> bool:
+        # False if no configuration and target can hold for the text, decided without tokenizing it
+        if self.target_range is None:
+            return True
+        return any(constraint.prefilter(self.text, target) for constraint in self.constraints for target in self.target_range)
 
     def __iter__(self):
-        val_iter = itertools.product(*self.init_range.values())
         def combined_iter():
-            for vals in val_iter:
+            for constraint in self.constraints:
                 if self.target_range is None:
-                    yield {k:v for k, v in zip(self.init_range.keys(), vals)}, None
-                else:
-                    for target in self.target_range:
-                        yield {k:v for k, v in zip(self.init_range.keys(), vals)}, target
+                    try:
+                        extracted = self.post_extract(constraint.extract(self.text))
+                    except: # if failed to extract example from text
+                        yield False, (constraint, None)
+                    else:
+                        yield True, (constraint, extracted)
+                    continue
+                # extract once per configuration and check every target against it
+                x, extracted = None, False
+                for target in self.target_range:
+                    if not constraint.prefilter(self.text, target):
+                        yield False, (constraint, target)
+                        continue
+                    if not extracted:
+                        x, extracted = constraint.extract(self.text), True
+                    yield constraint.check_extracted(x, target), (constraint, target)
         self._combined_iter = combined_iter()
         return self
     
     def __next__(self):
-        kwargs, target = next(self._combined_iter)
-        constraint = self.ConstraintCls(**kwargs)
-        if self.target_range is None:
-            try:
-                self.post_extract(constraint.extract(self.text))
-            except: # if failed to extract example from text
-                return False, (constraint, None)
-            return True, (constraint, self.post_extract(constraint.extract(self.text)))
-        return constraint(self.text, target), (constraint, target)
-       
\ No newline at end of file
+        return next(self._combined_iter)
@@ -2,8 +2,11 @@
 
 from typing import Callable, Iterable
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import collections
 import json
-import random
+import os
+import time
 from tqdm.autonotebook import tqdm
 
 from .extractor_utils import (
@@ -14,7 +17,7 @@ from .extractor_utils import (
     remove_brackets,
     all_caps_filter,
     no_sents_filter,
-    chain_processors,
+    compile_processors,
     chain_filters
 )
 
@@ -25,7 +28,7 @@ def gutenberg_preprocessor(text:str):
     return consecutive_whitespace_remover(text)
 
 def get_gutenberg_postprocessor() -> Callable[[str], str]:
-    return chain_processors(
+    return compile_processors(
         markdown_remover,
         remove_brackets,
         replace_singlenewline_with_space,
@@ -38,35 +41,112 @@ def get_gutenberg_filter() -> Callable[[str], bool]:
         no_sents_filter
     )
 
+
 class GutenbergLoader(TextLoader):
-    """class for iterating over Gutenberg, dammit files.""" 
-    def __init__(self, filepath:str, randomize:bool=False):
+    """class for iterating over Gutenberg, dammit files.
+
+    With prefetch > 0 the next `prefetch` books are read ahead by a pool of `num_workers` threads,
+    `prefetch_stats()` reports how often and how long __next__ had to wait for a book.
+    """ 
+    _state_attributes = ("english", "stats") # english is derived from metadata
+    def __init__(
+        self,
+        filepath:str,
+        randomize:bool=False,
+        seed:int=None,
+        prefetch:int=0,
+        num_workers:int=4,
+    ):
         self.filepath = Path(filepath)
         self.datadir = Path(filepath).parent
         self.randomize = randomize
+        self.seed = seed
+        self.prefetch = prefetch
+        self.num_workers = num_workers
         with self.filepath.open(mode="r") as f:
             self.metadata = json.load(f)
+        self.english = [m for m in self.metadata if m["Language"] == ["English"]]
         self._metadata_iter = None
+        self._queue = collections.deque() # (future, metadata) of the books read ahead
+        self._executor = None
+        self._executor_pid = None
+        self.reset_stats()
 
     def __iter__(self):
-        if self.randomize:
-            random.shuffle(self.metadata)
+        self._start()
         def metadata_iter():
-            for m in self.metadata:
+            for i in self._resume(self._order(len(self.english))):
+                m = self.english[i]
                 yield m["gd-path"], m
         self._metadata_iter = metadata_iter()
+        self._queue.clear()
+        if self.prefetch:
+            if self._executor is None or self._executor_pid != os.getpid():
+                # a forked process inherits the executor but not its threads
+                self._executor = ThreadPoolExecutor(self.num_workers)
+                self._executor_pid = os.getpid()
+            self._fill()
         return self
     
     def __next__(self):
-        lang = None 
-        while lang != ["English"]:
+        if not self.prefetch:
             path, m = next(self._metadata_iter)
-            lang = m["Language"]
-        txt = self.datadir.joinpath(path).read_text()
+            return self.datadir.joinpath(path).read_text(), m
+        if not self._queue:
+            raise StopIteration
+        self.stats["books"] += 1
+        self.stats["queue_depth"] += len(self._queue)
+        self.stats["ready"] += sum(future.done() for future, _ in self._queue)
+        future, m = self._queue.popleft()
+        start = time.perf_counter()
+        txt, read_time = future.result()
+        self.stats["wait_time"] += time.perf_counter() - start
+        self.stats["read_time"] += read_time
+        self._fill()
         return txt, m
+
+    def _fill(self):
+        while len(self._queue) < self.prefetch:
+            try:
+                path, m = next(self._metadata_iter)
+            except StopIteration:
+                return
+            self._queue.append((self._executor.submit(self._timed_read, self.datadir.joinpath(path)), m))
+
+    def _timed_read(self, path:Path):
+        start = time.perf_counter()
+        txt = path.read_text()
+        return txt, time.perf_counter() - start
+
+    def state_dict(self):
+        state = super().state_dict()
+        state["position"] -= len(self._queue) # books read ahead were not returned yet
+        return state
+
+    def reset_stats(self):
+        self.stats = {"books": 0, "queue_depth": 0, "ready": 0, "wait_time": 0.0, "read_time": 0.0}
+
+    def prefetch_stats(self) -> dict:
+        # averages per book returned: books in the queue / already read, seconds waited / spent reading
+        books = max(self.stats["books"], 1)
+        return {
+            "books": self.stats["books"],
+            "mean_queue_depth": self.stats["queue_depth"] / books,
+            "mean_ready": self.stats["ready"] / books,
+            "mean_wait": self.stats["wait_time"] / books,
+            "mean_read": self.stats["read_time"] / books,
+        }
+
+    def close(self):
+        for future, _ in self._queue:
+            future.cancel() # books not started yet are not read (shutdown's cancel_futures needs python 3.9)
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=True)
+        self._executor = None
+        self._queue.clear()
     
     def __len__(self):
-        return len(self.metadata)
+        return len(self.english)
 
 
 if __name__ == "__main__":
@@ -84,7 +164,8 @@ if __name__ == "__main__":
 
     textloader = GutenbergLoader(
         "data/gutenberg-dammit-files/gutenberg-metadata.json",
-        randomize=True
+        randomize=True,
+        prefetch=8
     )
 
     chunker = TextChunker(
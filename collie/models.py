@@ -1,18 +1,13 @@
 import os
 import re
-import openai
 import time
 import random
-import aiolimiter
 import asyncio
 import logging
-import tenacity
-import google.generativeai as palm
-from aiohttp import ClientSession
+import functools
 from typing import Any, List, Dict, Union
 from tqdm.asyncio import tqdm_asyncio
 from tqdm import tqdm
-from google.api_core import retry, exceptions
 
 
 
@@ -27,8 +22,9 @@ async def _throttled_openai_chat_completion_acreate(
     max_tokens: int,
     top_p: float,
     stop: Union[str, List[str]],
-    limiter: aiolimiter.AsyncLimiter,
+    limiter: "aiolimiter.AsyncLimiter",
 ) -> Dict[str, Any]:
+    import openai
     async with limiter:
         for _ in range(10000000000):
             try:
@@ -66,6 +62,9 @@ async def generate_from_openai_chat_completion(
         raise ValueError(
             "OPENAI_API_KEY environment variable must be set when using OpenAI API."
         )
+    import openai
+    import aiolimiter
+    from aiohttp import ClientSession
     openai.api_key = os.environ["OPENAI_API_KEY"]
     session = ClientSession()
     openai.aiosession.set(session)
@@ -116,20 +115,26 @@ def gpt_usage():
 
 
 # Google PaLM with TextGeneration
-palm.configure(api_key=os.environ["PALM_API_KEY"])
+@functools.lru_cache(maxsize=None)
+def get_palm():
+    # imported and configured on first use, so importing this module needs neither the package nor PALM_API_KEY
+    import google.generativeai as palm
+    palm.configure(api_key=os.environ["PALM_API_KEY"])
+    return palm
 
 
-@retry.Retry()
 def retry_chat(**kwargs):
-    return palm.chat(**kwargs)
+    from google.api_core import retry
+    return retry.Retry()(get_palm().chat)(**kwargs)
 
-@retry.Retry()
 def retry_reply(x, arg):
-    return x.reply(arg)
+    from google.api_core import retry
+    return retry.Retry()(x.reply)(arg)
 
-@tenacity.retry(wait=tenacity.wait_random_exponential(min=3, max=60), stop=tenacity.stop_after_attempt(6))
 def generate_text(*args, **kwargs):
-    return palm.generate_text(*args, **kwargs)
+    import tenacity
+    retrying = tenacity.retry(wait=tenacity.wait_random_exponential(min=3, max=60), stop=tenacity.stop_after_attempt(6))
+    return retrying(get_palm().generate_text)(*args, **kwargs)
 
 def palm_llm(prompt, model="models/text-bison-001", n=1, temperature=0.7):
     # Request configuration disabling all safety settings to prevent blocking
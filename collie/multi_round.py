@@ -0,0 +1,150 @@
+"""Multi-round generation with constraint feedback: generate, check, give feedback and regenerate."""
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+from tqdm import tqdm
+from .constraint_renderer import ConstraintRenderer
+
+# async (messages) -> generated text
+Generate = Callable[[List[Dict[str, str]]], Awaitable[str]]
+
+
+def round_keys(rounds:int) -> List[str]:
+    # keys of the multi-round logs: prompts, 1st_round_text, 1st_round_feedback, ..., last round text
+    keys = ["prompts"]
+    for i in range(1, rounds + 1):
+        keys.append(f"{ConstraintRenderer.ordinal(i)}_round_text")
+        if i < rounds:
+            keys.append(f"{ConstraintRenderer.ordinal(i)}_round_feedback")
+    return keys
+
+
+async def _run_example(
+    example: Dict[str, Any],
+    generate: Generate,
+    rounds: int,
+    semaphore: asyncio.Semaphore,
+    drop_satisfied: bool,
+) -> Dict[str, Any]:
+    renderer = ConstraintRenderer(example["constraint"], example["targets"])
+    satisfied = f"The generated {renderer.g_level} satisfies all constraints."
+    messages = [{"role": "user", "content": example["prompt"]}]
+    texts, feedbacks = [], []
+    for i in range(rounds):
+        async with semaphore:
+            text = await generate(messages)
+        texts.append(text)
+        if i == rounds - 1:
+            break
+        feedback = renderer.get_feedback(text)
+        feedbacks.append(feedback)
+        if drop_satisfied and feedback == satisfied:
+            break
+        messages = messages + [
+            {"role": "assistant", "content": text},
+            {"role": "user", "content": feedback},
+        ]
+    num_rounds = len(texts)
+    # examples that dropped out keep their last text and feedback for the remaining rounds
+    if num_rounds < rounds:
+        texts += [texts[-1]] * (rounds - num_rounds)
+        feedbacks += [feedbacks[-1]] * (rounds - 1 - len(feedbacks))
+    return {"prompt": example["prompt"], "texts": texts, "feedbacks": feedbacks, "num_rounds": num_rounds}
+
+
+async def run_multi_round(
+    examples: List[Dict[str, Any]],
+    generate: Generate,
+    rounds: int = 4,
+    max_concurrency: int = 64,
+    drop_satisfied: bool = False,
+    progress: bool = False,
+) -> Dict[str, List[Any]]:
+    """
+    Runs the generate - check - feedback protocol for each example (with "prompt", "constraint" and
+    "targets" as in data/all_data.dill). Every example advances through its rounds independently,
+    so its next request is sent as soon as its feedback is ready, and with drop_satisfied it stops
+    once the generation satisfies the constraint. It is off by default, the published logs regenerate
+    every example in every round.
+
+    Returns a dict in the format of logs/*-multi-round-generation-1trial.json, plus "num_rounds" with
+    the number of generations made for each example.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [_run_example(example, generate, rounds, semaphore, drop_satisfied) for example in examples]
+    bar = tqdm(total=len(tasks), disable=not progress)
+
+    async def tracked(task):
+        result = await task
+        bar.update()
+        return result
+
+    results = await asyncio.gather(*[tracked(task) for task in tasks])
+    bar.close()
+
+    keys = round_keys(rounds)
+    log = {key: [] for key in keys + ["num_rounds"]}
+    text_keys, feedback_keys = keys[1::2], keys[2::2]
+    for result in results:
+        log["prompts"].append(result["prompt"])
+        log["num_rounds"].append(result["num_rounds"])
+        for key, text in zip(text_keys, result["texts"]):
+            log[key].append(text)
+        for key, feedback in zip(feedback_keys, result["feedbacks"]):
+            log[key].append(feedback)
+    return log
+
+
+def openai_generate(
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    max_tokens: int = 1000,
+    requests_per_minute: int = None,
+) -> Generate:
+    # generation with the throttled OpenAI chat completion of collie.models
+    import openai
+    import aiolimiter
+    from . import models
+    if "OPENAI_API_KEY" not in os.environ:
+        raise ValueError(
+            "OPENAI_API_KEY environment variable must be set when using OpenAI API."
+        )
+    openai.api_key = os.environ["OPENAI_API_KEY"]
+    requests_per_minute = requests_per_minute or (200 if model == "gpt-4" else 300)
+    limiter = aiolimiter.AsyncLimiter(requests_per_minute)
+
+    async def generate(messages: List[Dict[str, str]]) -> str:
+        response = await models._throttled_openai_chat_completion_acreate(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=1,
+            stop=None,
+            limiter=limiter,
+        )
+        usage = response.get("usage", {})
+        if model in models.completion_tokens:
+            models.completion_tokens[model] += usage.get("completion_tokens", 0)
+            models.prompt_tokens[model] += usage.get("prompt_tokens", 0)
+        return response["choices"][0]["message"]["content"]
+
+    return generate
+
+
+def multi_round(
+    examples: List[Dict[str, Any]],
+    generate: Generate = None,
+    model: str = "gpt-4",
+    **kwargs,
+) -> Dict[str, List[Any]]:
+    # synchronous entry point, generates with OpenAI `model` unless `generate` is given
+    async def main():
+        if generate is not None:
+            return await run_multi_round(examples, generate, **kwargs)
+        import openai
+        from aiohttp import ClientSession
+        async with ClientSession() as session:
+            openai.aiosession.set(session)
+            return await run_multi_round(examples, openai_generate(model), **kwargs)
+    return asyncio.run(main())
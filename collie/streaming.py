@@ -0,0 +1,230 @@
+"""Incremental constraint evaluation over text that arrives in appended chunks."""
+from typing import Any, List, Tuple, Union
+
+from .tokenizers import get_tokenizer
+from .constraints import (
+    Level,
+    Constraint,
+    Logic,
+    And,
+    Or,
+    All,
+    Count,
+    Max,
+    Position,
+    ForEach,
+)
+
+
+def _strip_unit(unit:str) -> str:
+    # same normalization that Level applies to every unit
+    return unit.strip().strip('.')
+
+
+def _offsets(text:str, pieces:List[str], start:int=0) -> List[int]:
+    # tokenizers return slices of the text, so each piece can be located in order
+    offsets = []
+    for piece in pieces:
+        start = text.find(piece, start)
+        offsets.append(start)
+        start += len(piece)
+    return offsets
+
+
+class UnitStream:
+    """Tokenizes a growing text at a single level.
+
+    Units that can no longer change when more text is appended are kept in `stable`, only the
+    trailing (unstable) part of the text is tokenized again on each update.
+    """
+    # number of trailing sentences that may still change when text is appended
+    _unstable_sentences = 2
+
+    def __init__(self, level:str):
+        if level not in ('character', 'word', 'sentence', 'paragraph'):
+            raise NotImplementedError(f'Streaming is not supported for level {level}.')
+        self.level = level
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.stable:List[str] = []
+        self._tail_start = 0
+        self._tail:List[str] = []
+
+    def update(self, chunk:str) -> List[str]:
+        self.text += chunk
+        if self.level == 'character':
+            self.stable.extend(_strip_unit(c) for c in chunk)
+        elif self.level == 'paragraph':
+            paragraphs = self.text[self._tail_start:].split(Level._para_delim)
+            for p in paragraphs[:-1]:
+                self.stable.append(_strip_unit(p))
+                self._tail_start += len(p) + len(Level._para_delim)
+            self._tail = [_strip_unit(paragraphs[-1])]
+        else:
+            self._update_sentences()
+        return self.units
+
+    def _update_sentences(self):
+        tail = self.text[self._tail_start:]
+        sentences = get_tokenizer().sentences(tail)
+        offsets = _offsets(tail, sentences)
+        num_stable = max(len(sentences) - self._unstable_sentences, 0)
+        for s in sentences[:num_stable]:
+            self.stable.extend(self._units_of_sentence(s))
+        if num_stable < len(sentences):
+            self._tail_start += offsets[num_stable]
+        else:
+            self._tail_start = len(self.text)
+        self._tail = [u for s in sentences[num_stable:] for u in self._units_of_sentence(s)]
+
+    def _units_of_sentence(self, sentence:str) -> List[str]:
+        if self.level == 'sentence':
+            return [_strip_unit(sentence)]
+        # words are tokenized within each sentence, so words of a stable sentence are stable
+        return [_strip_unit(w) for w in get_tokenizer().words(sentence, preserve_line=True)]
+
+    @property
+    def units(self) -> List[str]:
+        if self.level == 'character':
+            return list(self.stable)
+        return self.stable + self._tail
+
+
+class StreamingConstraint:
+    """Stateful evaluator that consumes text in chunks and answers whether the text so far
+    satisfies a constraint, and whether any continuation of it still can.
+
+    >>> stream = StreamingConstraint(c, target=5)
+    >>> for chunk in chunks:
+    >>>     stream.update(chunk)
+    >>>     if not stream.can_satisfy():
+    >>>         break
+    >>> stream.check()
+    """
+    def __init__(self, constraint:Union[Constraint, Logic], target:Any=None):
+        self.constraint = constraint
+        self.target = target
+        self.children:List[StreamingConstraint] = []
+        if isinstance(constraint, (And, Or)):
+            self.children = [StreamingConstraint(constraint.callable_1), StreamingConstraint(constraint.callable_2)]
+        elif isinstance(constraint, All):
+            self.children = [StreamingConstraint(c) for c in constraint.callables]
+        elif isinstance(constraint, Constraint):
+            self._input_level = constraint.input_level.level if constraint.input_level is not None else None
+            self._target_level = constraint.target_level
+            self._stream = UnitStream(self._input_level or constraint.target_level.level)
+            self._stable_targets:List[Any] = [] # target level units of each stable input unit
+        else:
+            raise ValueError(f'Cannot stream constraint of type {type(constraint)}.')
+        self.text = ""
+
+    def reset(self):
+        self.text = ""
+        for child in self.children:
+            child.reset()
+        if not self.children:
+            self._stream.reset()
+            self._stable_targets = []
+
+    def update(self, chunk:str) -> "StreamingConstraint":
+        self.text += chunk
+        for child in self.children:
+            child.update(chunk)
+        if not self.children:
+            self._stream.update(chunk)
+            if self._input_level is not None:
+                for unit in self._stream.stable[len(self._stable_targets):]:
+                    self._stable_targets.append(self._target_level(unit))
+        return self
+
+    def _units(self, stable_only:bool=False) -> List[Any]:
+        if self._input_level is None:
+            return list(self._stream.stable) if stable_only else self._stream.units
+        if stable_only:
+            return list(self._stable_targets)
+        tail = self._stream.units[len(self._stable_targets):]
+        return self._stable_targets + [self._target_level(unit) for unit in tail]
+
+    def extract(self) -> Any:
+        if self.children:
+            return [child.extract() for child in self.children]
+        return self.constraint.transformation(self._units())
+
+    def check(self, target:Any=None) -> bool:
+        target = self.target if target is None else target
+        if self.children:
+            results = [child.check(t) for child, t in zip(self.children, self._split_target(target))]
+            return any(results) if isinstance(self.constraint, Or) else all(results)
+        return self.constraint.reduction(self.extract(), target, self.constraint.relation)
+
+    def can_satisfy(self, target:Any=None) -> bool:
+        # conservative: returns False only if no continuation of the text can satisfy the constraint
+        target = self.target if target is None else target
+        if self.children:
+            results = [child.can_satisfy(t) for child, t in zip(self.children, self._split_target(target))]
+            return any(results) if isinstance(self.constraint, Or) else all(results)
+        if not self._units(stable_only=True):
+            return True
+        x = self.constraint.transformation(self._units(stable_only=True))
+        return not self._violated(x, target)
+
+    def _split_target(self, target:Any) -> List[Any]:
+        # mirrors how And/Or/All hand targets to their callables
+        if isinstance(target, list) and (isinstance(self.constraint, All) or len(target) == 2):
+            return target
+        return [target] * len(self.children)
+
+    def _violated(self, x:Any, target:Any) -> bool:
+        # x is computed on the stable units only, which every continuation keeps
+        transformation = self.constraint.transformation
+        relation = self.constraint.relation
+        reduction = self.constraint.reduction
+        if isinstance(target, list) and len(target) == 1 and reduction.reduction is None:
+            target = target[0]
+        if reduction.reduction is None:
+            if isinstance(transformation, Count) or (isinstance(transformation, Max) and x is not None):
+                # counts only grow as more units are appended
+                return _exceeds(x, target, relation.operand)
+            if isinstance(transformation, Position) and relation.operand == '==':
+                positions = transformation.position if isinstance(transformation.position, list) else [transformation.position]
+                values = x if isinstance(x, list) else [x]
+                if all(p >= 0 for p in positions) and None not in values:
+                    return not relation(x, target)
+            if isinstance(transformation, ForEach) and transformation.func is Ellipsis and relation.operand == 'not in':
+                return not relation(x, target)
+            return False
+        if isinstance(transformation, ForEach) and reduction.reduction in ('all', 'at most', 'exactly'):
+            # each element is computed from its own (stable) input unit
+            if isinstance(target, list):
+                if len(x) > len(target):
+                    return True
+                targets = target[:len(x)]
+            else:
+                targets = [target] * len(x)
+            num_sat = sum(relation(x_i, t_i) for x_i, t_i in zip(x, targets))
+            if reduction.reduction == 'all':
+                return num_sat < len(x)
+            return num_sat > reduction.value
+        return False
+
+
+def _exceeds(count:int, target:int, operand:str) -> bool:
+    if not isinstance(target, int):
+        return False
+    if operand in ('==', '<='):
+        return count > target
+    if operand == '<':
+        return count >= target
+    return False
+
+
+def stream_check(constraint:Union[Constraint, Logic], chunks:List[str], target:Any) -> Tuple[bool, int]:
+    # consume chunks until the constraint becomes unsatisfiable, returns (satisfied, chunks consumed)
+    stream = StreamingConstraint(constraint, target)
+    for i, chunk in enumerate(chunks):
+        stream.update(chunk)
+        if not stream.can_satisfy():
+            return False, i + 1
+    return stream.check(), len(chunks)
@@ -0,0 +1,272 @@
+"""Tokenizer backends used by `Level` to split text into words and sentences."""
+import re
+import string
+import functools
+from typing import Any, Dict, Iterable, List, Union
+
+
+# every substring of string.punctuation, so `x in PUNCTUATION_UNITS` is the same test as the
+# substring check `x in string.punctuation` but done in O(1).
+PUNCTUATION_UNITS = frozenset(
+    string.punctuation[i:j] for i in range(len(string.punctuation) + 1) for j in range(i, len(string.punctuation) + 1)
+)
+
+
+def load_punkt(language:str="english"):
+    # returns a loaded punkt sentence tokenizer, supports both the punkt_tab (nltk>=3.8.2) and pickle formats
+    import nltk
+    try:
+        from nltk.tokenize import PunktTokenizer
+        return PunktTokenizer(language)
+    except ImportError:
+        return nltk.data.load(f"tokenizers/punkt/{language}.pickle")
+
+
+_punkt:Dict[str, Any] = {} # punkt models loaded by this process, by language
+
+
+def get_punkt(language:str="english"):
+    # the punkt model of language, loaded once per process from the local nltk data and never downloaded.
+    # Models loaded before forking are shared with the child processes.
+    model = _punkt.get(language)
+    if model is None:
+        try:
+            model = _punkt[language] = load_punkt(language)
+        except LookupError as e:
+            raise LookupError(
+                f"Punkt model for {language} is not installed, download it once with "
+                "`python -m nltk.downloader punkt_tab punkt`."
+            ) from e
+    return model
+
+
+def preload(languages:Iterable[str]=("english",)):
+    # load the sentence models before forking workers, so that they inherit them instead of loading their own
+    import nltk
+    for language in languages:
+        get_punkt(language)
+        nltk.sent_tokenize("", language) # nltk keeps its own model for word_tokenize and the nltk backend
+
+
+def sent_tokenize(text:str, language:str="english") -> List[str]:
+    # same as nltk.sent_tokenize, with the shared model
+    return get_punkt(language).tokenize(text)
+
+
+class Tokenizer:
+    """Base tokenizer backend.
+
+    `words` returns the word tokens of a text with punctuation-only tokens removed, `sentences` returns
+    the sentences of a text as slices of it.
+    """
+    name:str = None
+
+    def words(self, text:str, preserve_line:bool=False) -> List[str]:
+        raise NotImplementedError
+
+    def sentences(self, text:str) -> List[str]:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+
+class NLTKTokenizer(Tokenizer):
+    """Reference backend, uses `nltk.word_tokenize` and `nltk.sent_tokenize` directly."""
+    name = "nltk"
+
+    def words(self, text:str, preserve_line:bool=False) -> List[str]:
+        import nltk # imported on first use, importing nltk takes longer than importing collie
+        return [x for x in nltk.word_tokenize(text, preserve_line=preserve_line) if x not in PUNCTUATION_UNITS]
+
+    def sentences(self, text:str) -> List[str]:
+        import nltk
+        return nltk.sent_tokenize(text)
+
+
+class RegexTokenizer(Tokenizer):
+    """Fast backend that produces the same units as `NLTKTokenizer`.
+
+    Sentences are split with a punkt model that is loaded once. Words are found in a single pass over
+    the whitespace separated chunks of each sentence: chunks that are a plain word with optional
+    brackets and trailing punctuation are resolved by one precompiled regex, since the treebank cascade
+    always reduces them to the bare word. Everything else (quotes, contractions, symbols, the sentence
+    final period) is handed to the treebank tokenizer chunk by chunk and memoized, which is exact because
+    the treebank rules only look at the surrounding whitespace.
+    """
+    name = "regex"
+
+    # a chunk that is a word of ascii letters/digits (optionally hyphenated) wrapped in brackets and punctuation
+    # that the treebank tokenizer always splits off and `Level` always drops. Words that the treebank
+    # tokenizer splits in two (see nltk MacIntyreContractions) are excluded. Any other chunk is matched whole.
+    _word_part = r"(?!(?i:cannot|gimme|gonna|gotta|lemme|wanna)(?![A-Za-z0-9]))[A-Za-z0-9]+"
+    _chunk = re.compile(
+        rf"(?<!\S)[(\[{{]*({_word_part}(?:-{_word_part})*)[,;:?!)\]}}]*\.?[,;:?!)\]}}]*(?!\S)|\S+"
+    )
+    # characters that can follow the sentence final period (see NLTKWordTokenizer.PUNCTUATION)
+    _final_chars = frozenset("])}>\"'»”’")
+    _cache_size = 2 ** 16
+
+    def __init__(self, language:str="english"):
+        self.language = language
+        from nltk.tokenize import NLTKWordTokenizer
+        self._treebank = NLTKWordTokenizer()
+        self._chunk_words = functools.lru_cache(maxsize=self._cache_size)(self._tokenize_chunk)
+
+    def __getstate__(self):
+        # the chunk cache can't be pickled, e.g. for spawned workers, they start with an empty one
+        state = self.__dict__.copy()
+        del state["_chunk_words"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._chunk_words = functools.lru_cache(maxsize=self._cache_size)(self._tokenize_chunk)
+
+    @property
+    def punkt(self):
+        return get_punkt(self.language)
+
+    def sentences(self, text:str) -> List[str]:
+        return self.punkt.tokenize(text)
+
+    def words(self, text:str, preserve_line:bool=False) -> List[str]:
+        if preserve_line:
+            return self._sentence_words(text)
+        words = []
+        for sentence in self.sentences(text):
+            words.extend(self._sentence_words(sentence))
+        return words
+
+    def _tokenize_chunk(self, prefix:str, chunk:str, suffix:str) -> List[str]:
+        # treebank tokens of a chunk given the whitespace before and after it (none after the sentence
+        # final chunk). Non final chunks get a dummy word appended so the end of sentence rules do not fire.
+        if not suffix:
+            tokens = self._treebank.tokenize(prefix + chunk)
+        else:
+            tokens = self._treebank.tokenize(prefix + chunk + suffix + "a")[:-1]
+        return [x for x in tokens if x not in PUNCTUATION_UNITS]
+
+    def _sentence_words(self, sentence:str) -> List[str]:
+        tail = self._tail_start(sentence)
+        words = []
+        for match in self._chunk.finditer(sentence, 0, tail):
+            word = match.group(1)
+            if word is not None:
+                words.append(word)
+            else:
+                words.extend(self._chunk_words(
+                    self._prefix(sentence, match.start()), match.group(), self._suffix(sentence, match.end())
+                ))
+        if tail < len(sentence):
+            words.extend(self._chunk_words(self._prefix(sentence, tail), sentence[tail:].rstrip(), ""))
+        return words
+
+    def _tail_start(self, sentence:str) -> int:
+        # start of the last chunk that is not only closing quotes/brackets, the end of sentence rules
+        # apply from there on
+        end = len(sentence.rstrip())
+        while end > 0:
+            start = end
+            while start > 0 and not sentence[start - 1].isspace():
+                start -= 1
+            if start == 0 or not set(sentence[start:end]) <= self._final_chars:
+                return start
+            end = len(sentence[:start].rstrip())
+        return end
+
+    @staticmethod
+    def _prefix(sentence:str, start:int) -> str:
+        # only a literal space (as opposed to other whitespace) or the start of the sentence changes how quotes are handled
+        if start == 0:
+            return ""
+        return " " if sentence[start - 1] == " " else "\n"
+
+    @staticmethod
+    def _suffix(sentence:str, end:int) -> str:
+        # same for the whitespace after a chunk, e.g. a quote is split off before a literal space only
+        return " " if sentence[end] == " " else "\n"
+
+    def cache_info(self):
+        return self._chunk_words.cache_info()
+
+
+class MemoTokenizer(Tokenizer):
+    """Wraps another backend and remembers the units of the texts it tokenized most recently, for
+    scans where several constraints tokenize the same text one after another."""
+
+    def __init__(self, tokenizer:Tokenizer, maxsize:int=256):
+        self.tokenizer = tokenizer
+        self.name = tokenizer.name
+        self.maxsize = maxsize
+        self._cache()
+
+    def _cache(self):
+        self._words = functools.lru_cache(maxsize=self.maxsize)(self._tokenize_words)
+        self._sentences = functools.lru_cache(maxsize=self.maxsize)(self._tokenize_sentences)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_words"], state["_sentences"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cache()
+
+    def _tokenize_words(self, text:str, preserve_line:bool) -> tuple:
+        return tuple(self.tokenizer.words(text, preserve_line=preserve_line))
+
+    def _tokenize_sentences(self, text:str) -> tuple:
+        return tuple(self.tokenizer.sentences(text))
+
+    def words(self, text:str, preserve_line:bool=False) -> List[str]:
+        return list(self._words(text, preserve_line))
+
+    def sentences(self, text:str) -> List[str]:
+        return list(self._sentences(text))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.tokenizer!r})'
+
+
+_TOKENIZERS:Dict[str, type] = {
+    NLTKTokenizer.name: NLTKTokenizer,
+    RegexTokenizer.name: RegexTokenizer,
+}
+_tokenizer:Tokenizer = NLTKTokenizer()
+
+
+def get_tokenizer() -> Tokenizer:
+    return _tokenizer
+
+
+def set_tokenizer(tokenizer:Union[str, Tokenizer]) -> Tokenizer:
+    # select the tokenizer backend used by all levels, returns the previous backend
+    global _tokenizer
+    previous = _tokenizer
+    if isinstance(tokenizer, str):
+        if tokenizer not in _TOKENIZERS:
+            raise ValueError(f'Unknown tokenizer {tokenizer}, must be one of {list(_TOKENIZERS)}.')
+        tokenizer = _TOKENIZERS[tokenizer]()
+    _tokenizer = tokenizer
+    return previous
+
+
+def _normalize(units:List[str]) -> List[str]:
+    # the normalization Level applies to every unit
+    return [u.strip().strip('.') for u in units]
+
+
+def compare_tokenizers(texts:List[str], reference:Tokenizer=None, candidate:Tokenizer=None) -> List[int]:
+    # returns the indices of texts for which the two backends disagree on word or sentence units
+    reference = reference or NLTKTokenizer()
+    candidate = candidate or RegexTokenizer()
+    mismatches = []
+    for i, text in enumerate(texts):
+        if (
+            _normalize(reference.words(text)) != _normalize(candidate.words(text))
+            or _normalize(reference.sentences(text)) != _normalize(candidate.sentences(text))
+        ):
+            mismatches.append(i)
+    return mismatches
@@ -1,11 +1,9 @@
 """Loader and extractor for Wikipedia"""
-import random
-import copy
-from typing import List
+from typing import Iterable
 from datasets import load_dataset, Dataset
 
 from .extractor_utils import (
-    TextLoader,
+    DatasetLoader,
     no_sents_filter,
     url_filter,
     caption_filter,
@@ -13,8 +11,11 @@ from .extractor_utils import (
 )
 
 
+def likely_table(text:str) -> bool:
+    return "|" in text
+
+
 def get_wiki_filter():
-    likely_table = lambda x: "|" in x
     return chain_filters(
         likely_table,
         url_filter,
@@ -31,38 +32,36 @@ def get_wiki_postprocessor():
     return _wiki_postprocessor
 
 
-class WikiLoader(TextLoader):
+class WikiLoader(DatasetLoader):
     """class for iterating over Wikipedia Articles.""" 
-    def __init__(self, cache_dir:str=None, randomize:bool=False, split="train", **kwargs):
-        self.randomize = randomize
-        self.dataset:Dataset = load_dataset(
+    def __init__(
+        self,
+        cache_dir:str=None,
+        randomize:bool=False,
+        split="train",
+        streaming:bool=False,
+        columns:Iterable[str]=None,
+        batch_size:int=1000,
+        buffer_size:int=10000,
+        seed:int=None,
+        **kwargs
+    ):
+        dataset:Dataset = load_dataset(
             "wikipedia",
             "20220301.en",
             cache_dir=cache_dir,
             split=split,
             **kwargs
         )
-        self.indices:List = None
-
-    def __iter__(self):
-        self.indices = list(range(len(self.dataset)))
-        if self.randomize:
-            random.shuffle(self.indices)
-        def metadata_iter():
-            for idx in self.indices:
-                datadict = copy.deepcopy(self.dataset[idx])
-                txt = datadict.pop("text")
-                datadict["index"] = idx
-                yield txt, datadict 
-        self._metadata_iter = metadata_iter()
-        return self
-    
-    def __next__(self):
-        txt, meta = next(self._metadata_iter)
-        return txt, meta
-    
-    def __len__(self):
-        return len(self.dataset)
+        super().__init__(
+            dataset,
+            randomize=randomize,
+            streaming=streaming,
+            columns=columns,
+            batch_size=batch_size,
+            buffer_size=buffer_size,
+            seed=seed,
+        )
 
 if __name__ == "__main__":
     # dataset = load_dataset("wikipedia", "20220301.en", cache_dir="./data")
@@ -81,7 +80,9 @@ if __name__ == "__main__":
 
     textloader = WikiLoader(
         cache_dir="./data",
-        randomize=True
+        randomize=True,
+        streaming=True,
+        columns=("title",)
     )
 
     chunker = TextChunker(
@@ -1,4 +1,5 @@
 mkdir -p data
+python -m nltk.downloader punkt_tab punkt
 wget -P ./data/ http://static.decontextualize.com/gutenberg-dammit-files-v002.zip
 unzip -qo data/gutenberg-dammit-files-v002.zip -d ./data
 # wget -P ./data/ https://raw.githubusercontent.com/dwyl/english-words/master/words_alpha.txt
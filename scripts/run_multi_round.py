@@ -0,0 +1,53 @@
+import dill
+import json
+import logging
+import os
+import sys
+import argparse
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from collie.models import gpt_usage
+from collie.multi_round import multi_round
+logging.getLogger().setLevel(logging.ERROR)
+
+
+def parse_args():
+    args = argparse.ArgumentParser()
+    args.add_argument('--model', type=str, choices=['gpt-4', 'gpt-3.5-turbo'], required=True)
+    args.add_argument('--rounds', type=int, default=4)
+    args.add_argument('--max_concurrency', type=int, default=64)
+    args.add_argument('--drop_satisfied', action='store_true', help="stop generating for examples once they satisfy their constraint")
+    args.add_argument('--output', type=str, default=None, help="defaults to logs/{model}-multi-round-rerun.json, next to the published logs")
+    args = args.parse_args()
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(args)
+
+    # load all data
+    with open("data/all_data.dill", "rb") as f:
+        all_data = dill.load(f)
+
+    # one example per prompt
+    examples, prompts = [], set()
+    for k in all_data:
+        for example in all_data[k]:
+            if example["prompt"] not in prompts:
+                prompts.add(example["prompt"])
+                examples.append(example)
+    print(len(examples))
+
+    log = multi_round(
+        examples,
+        model=args.model,
+        rounds=args.rounds,
+        max_concurrency=args.max_concurrency,
+        drop_satisfied=args.drop_satisfied,
+        progress=True,
+    )
+    with open(args.output or f"logs/{args.model}-multi-round-rerun.json", "w") as f:
+        json.dump(log, f, indent=2)
+
+    print(sum(log["num_rounds"]), "generations")
+    print(gpt_usage())
@@ -13,6 +13,7 @@ setuptools.setup(
     long_description_content_type='text/markdown',
     install_requires=[
         'nltk>=3.8',
+        'numpy',
         'openai',
         'rich',
         'dill',
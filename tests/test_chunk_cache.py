@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+from collie.extractor_utils import TextChunker, TextLoader
+from collie.extract_constraints import FullExtractor
+from collie.chunk_cache import ChunkCache, fingerprint
+
+
+class ListLoader(TextLoader):
+    def __init__(self, docs, name="docs"):
+        self.docs = docs
+        self.name = name
+        self._iterations = 0
+
+    def __iter__(self):
+        self._iterations += 1
+        return iter(self.docs)
+
+    def __len__(self):
+        return len(self.docs)
+
+
+DOCS = [("First one.\n\nSecond one.\n\nx", {"title": "a", "tags": ("b",)}), ("Ünïcode text.\n\nLast.", {"title": "c"})]
+
+
+def comprehension_chunker():
+    # the filter holds a nested code object, whose repr includes its address
+    return TextChunker(paragraph_delim="\n\n", filter=lambda p: any(w in {"x", "y"} for w in p.split()))
+
+
+class TestChunkCache(unittest.TestCase):
+    def test_same_sequences(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            loader = ListLoader(DOCS)
+            chunker = TextChunker(paragraph_delim="\n\n", filter=lambda p: len(p) < 2)
+            extractor = FullExtractor(chunker, loader, metadata_fields=("title",))
+            expected = list(extractor._sequences(max_seq_per_document=2))
+            extractor.cache_dir = tmp
+            self.assertEqual(list(extractor._sequences(max_seq_per_document=2)), expected)
+            self.assertEqual(list(extractor._sequences(max_seq_per_document=2)), expected)
+            self.assertEqual(loader._iterations, 2)
+
+            cache = ChunkCache.get(tmp, loader, chunker, max_seq_per_document=2, metadata_fields=("title",))
+            self.assertEqual(len(cache), 4)
+            self.assertEqual(cache.chunk(2), "Ünïcode text.")
+            cache.close()
+
+    def test_fingerprint(self):
+        loader, chunker = ListLoader(DOCS), TextChunker(paragraph_delim="\n\n")
+        key = fingerprint(loader, chunker)
+        self.assertEqual(fingerprint(ListLoader(DOCS), TextChunker(paragraph_delim="\n\n")), key)
+        self.assertNotEqual(fingerprint(ListLoader(DOCS, "other"), chunker), key)
+        self.assertNotEqual(fingerprint(loader, TextChunker(paragraph_delim="\n")), key)
+        self.assertNotEqual(fingerprint(loader, TextChunker(paragraph_delim="\n\n", filter=lambda p: True)), key)
+        self.assertNotEqual(fingerprint(loader, chunker, max_documents=1), key)
+        self.assertNotEqual(fingerprint(ListLoader(DOCS[:1]), chunker), key)
+
+    def test_fingerprint_across_processes(self):
+        key = fingerprint(ListLoader(DOCS), comprehension_chunker())
+        code = (
+            "import test_chunk_cache as t; from collie.chunk_cache import fingerprint; "
+            "print(fingerprint(t.ListLoader(t.DOCS), t.comprehension_chunker()))"
+        )
+        tests = os.path.dirname(os.path.abspath(__file__))
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join([tests, os.path.dirname(tests)])}
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), key)
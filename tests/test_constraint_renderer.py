@@ -0,0 +1,93 @@
+import unittest
+from collie.constraints import (
+    TargetLevel,
+    InputLevel,
+    Relation,
+    Reduction,
+    Count,
+    Position,
+    ForEach,
+    Constraint,
+    All,
+)
+from collie.constraint_renderer import ConstraintRenderer, batch_feedback
+from collie.tokenizers import MemoTokenizer, RegexTokenizer, set_tokenizer
+
+
+class UnregisteredTokenizer(RegexTokenizer):
+    name = None
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        ConstraintRenderer.clear_template_cache()
+
+    def assertSameAsUncached(self, constraint, check_value):
+        prompt = ConstraintRenderer(constraint, check_value).prompt
+        self.assertEqual(prompt, ConstraintRenderer(constraint, check_value, use_cache=False).prompt)
+        return prompt
+
+    def test_count(self):
+        c = Constraint(
+            target_level=TargetLevel('word'),
+            transformation=Count(),
+            relation=Relation('=='),
+        )
+        self.assertEqual(self.assertSameAsUncached(c, 5), 'Please generate a sentence with exactly 5 words.')
+        self.assertEqual(self.assertSameAsUncached(c, 7), 'Please generate a sentence with exactly 7 words.')
+        self.assertSameAsUncached(c, 1)
+        info = ConstraintRenderer.template_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_all(self):
+        c = All(
+            Constraint(
+                input_level=InputLevel('sentence'),
+                target_level=TargetLevel('word'),
+                transformation=ForEach(Position(-1)),
+                relation=Relation('=='),
+            ),
+            Constraint(
+                target_level=TargetLevel('sentence'),
+                transformation=Count(),
+                relation=Relation('=='),
+            ),
+        )
+        self.assertSameAsUncached(c, [['end', 'word'], 2])
+        self.assertSameAsUncached(c, [['last', 'one'], 2])
+        self.assertSameAsUncached(c, [['quoted', "don't"], 2])
+        info = ConstraintRenderer.template_cache_info()
+        self.assertEqual((info.hits, info.misses, info.bypassed), (1, 1, 1))
+
+
+class TestBatchFeedback(unittest.TestCase):
+    def test_same_as_get_feedback(self):
+        c = Constraint(
+            input_level=InputLevel('sentence'),
+            target_level=TargetLevel('word'),
+            transformation=ForEach(Position(-1)),
+            relation=Relation('=='),
+            reduction=Reduction('all'),
+        )
+        count = Constraint(
+            target_level=TargetLevel('sentence'),
+            transformation=Count(),
+            relation=Relation('=='),
+        )
+        items = [
+            (c, 'end', 'This is the end. Another end.'),
+            (c, 'end', 'This is the end. Not here.'),
+            (count, 2, 'One sentence. Two sentences.'),
+            (All(c, count), ['end', 3], 'This is the end. Another end.'),
+        ]
+        expected = [ConstraintRenderer(*item[:2]).get_feedback(item[2]) for item in items]
+        self.assertEqual(expected[0], 'The generated sentence satisfies all constraints.')
+        self.assertNotEqual(expected[1], expected[0])
+        self.assertEqual(batch_feedback(items), expected)
+        self.assertEqual(batch_feedback(items, processes=2, chunksize=1), expected)
+        for tokenizer in (UnregisteredTokenizer(), MemoTokenizer(UnregisteredTokenizer())):
+            previous = set_tokenizer(tokenizer)
+            try:
+                self.assertEqual(batch_feedback(items, processes=2, chunksize=1), expected)
+            finally:
+                set_tokenizer(previous)
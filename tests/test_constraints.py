@@ -1,3 +1,6 @@
+import os
+import sys
+import subprocess
 import unittest
 from collie.constraints import (
     TargetLevel,
@@ -44,6 +47,26 @@ class TestCombinedConstraints(unittest.TestCase):
         result = c.check('This is a sentence. This is another sentence. This is the third utterance. This is the fourth line. This sentence is a slightly longer fifth line.', 'sentence')
         self.assertTrue(result)
 
+    def test_and_evaluate(self):
+        c_1 = Constraint(
+            input_level=InputLevel('sentence'),
+            target_level=TargetLevel('word'),
+            transformation=ForEach(...),
+            relation=Relation('in'),
+            reduction=Reduction('at least', 2),
+        )
+        c_2 = Constraint(
+            input_level=InputLevel('sentence'),
+            target_level=TargetLevel('word'),
+            transformation=ForEach(Position(-1)),
+            relation=Relation('in'),
+            reduction=Reduction('at least', 2),
+        )
+        c = And(c_1, c_2)
+        satisfied, extracted = c.evaluate('This is a sentence. This is another sentence. This is the third utterance. This is the fourth line. This sentence is a slightly longer fifth line.', 'sentence')
+        self.assertTrue(satisfied)
+        self.assertEqual(extracted[1], ['sentence', 'sentence', 'utterance', 'line', 'line'])
+
 
 class TestCharLevelConstraints(unittest.TestCase):
     def test_num_chars(self):
@@ -142,3 +165,75 @@ class TestWordLevelConstraints(unittest.TestCase):
         )
         result = c.check('This is a sentence. This is another sentence. This is the third utterance. This is the fourth line. This is a slightly longer fifth string.', 'sentence')
         self.assertTrue(result)
+
+
+class TestPrefilter(unittest.TestCase):
+    TEXT = 'This is a sentence. This is another sentence. This is the third utterance. This is the fourth line. This is a slightly longer fifth string.'
+
+    def test_none_levels(self):
+        # the c04 constraints of data/all_data.dill were pickled with input_level=None
+        c = Constraint(target_level=TargetLevel('character'), transformation=Count(), relation=Relation('=='))
+        c.input_level = None
+        self.assertTrue(c.check('good', 4))
+        self.assertTrue(c.prefilter('good', 3))
+        c.target_level = None
+        self.assertTrue(c.prefilter('good', 3))
+
+    def test_exact_counts(self):
+        c = Constraint(target_level=TargetLevel('character'), transformation=Count(), relation=Relation('=='))
+        self.assertTrue(c.prefilter('good', 4))
+        self.assertFalse(c.prefilter('good', 3))
+        c = Constraint(target_level=TargetLevel('paragraph'), transformation=Count(), relation=Relation('>='))
+        self.assertFalse(c.prefilter('one\n\ntwo', 3))
+
+    def test_sentence_bound(self):
+        c = Constraint(target_level=TargetLevel('sentence'), transformation=Count(), relation=Relation('=='))
+        self.assertTrue(c.prefilter(self.TEXT, 5))
+        self.assertTrue(c.prefilter(self.TEXT, 6))
+        self.assertFalse(c.prefilter(self.TEXT, 7))
+
+    def test_required_words(self):
+        c = Constraint(target_level=TargetLevel('word'), transformation=Position(-1), relation=Relation('=='))
+        self.assertTrue(c.prefilter('This is a good sentence.', 'Sentence'))
+        self.assertFalse(c.prefilter('This is a good sentence.', 'word'))
+        c = Constraint(
+            input_level=InputLevel('sentence'),
+            target_level=TargetLevel('word'),
+            transformation=ForEach(...),
+            relation=Relation('in'),
+            reduction=Reduction('at least', 2),
+        )
+        self.assertTrue(c.prefilter(self.TEXT, 'sentence'))
+        self.assertFalse(c.prefilter(self.TEXT, 'chicken'))
+        c.reduction = Reduction('all')
+        self.assertTrue(c.prefilter(self.TEXT, 'chicken'))
+        c = Constraint(target_level=TargetLevel('word'), transformation=ForEach(...), relation=Relation('not in'))
+        self.assertTrue(c.prefilter(self.TEXT, ['this']))
+
+    def test_list_target_per_unit(self):
+        # list targets are zipped with the units, with 'any' only one of them has to be in the text
+        c = Constraint(
+            input_level=InputLevel('sentence'),
+            target_level=TargetLevel('word'),
+            transformation=ForEach(...),
+            relation=Relation('in'),
+            reduction=Reduction('any'),
+        )
+        text = 'The cat sat. The dog ran.'
+        self.assertTrue(c.check_extracted(c.extract(text), ['cat', 'zebra']))
+        self.assertTrue(c.prefilter(text, ['cat', 'zebra']))
+        c.reduction = Reduction('all')
+        self.assertFalse(c.prefilter(text, ['cat', 'zebra']))
+        self.assertTrue(c.prefilter(text, ['cat', 'dog']))
+
+
+class TestImport(unittest.TestCase):
+    def test_no_heavy_dependencies(self):
+        # evaluation workers import constraints and the renderer, their heavy dependencies load on first use
+        code = (
+            "import sys; from collie.constraints import Constraint; from collie.constraint_renderer import ConstraintRenderer; "
+            "print(sorted(m for m in ('numpy', 'nltk', 'rich', 'openai') if m in sys.modules))"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "[]")
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from collie.constraints import Constraint, TargetLevel, Count, Position, ForEach, Relation
+from collie.extractor_utils import TextChunker, ConstraintExtractor
+from collie.extract_constraints import FullExtractor
+from collie.corpus_index import CorpusIndex
+
+
+DOCS = [
+    ("The cat sat. It was happy.\n\nA dog ran to the park.", {"title": "a"}),
+    ("Birds sing. Trees grow tall. The sun sets.\n\nNothing else.", {"title": "b"}),
+]
+
+
+class TestCorpusIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.extractor = FullExtractor(TextChunker(paragraph_delim="\n\n"), DOCS, metadata_fields=("title",))
+        self.index = self.extractor.build_index(self.tmp.name)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_stats(self):
+        index = CorpusIndex(self.tmp.name)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.chunk(1), ("A dog ran to the park.", {"title": "a"}))
+        self.assertEqual(list(index.counts["word"]), [6, 6, 8, 2])
+        self.assertEqual(list(index.postings("THE")), [0, 1, 2])
+        index.close()
+
+    def test_candidates(self):
+        sentences = ConstraintExtractor(
+            {"target_level": [TargetLevel("sentence")], "transformation": [Count()], "relation": [Relation("==")]},
+            target_range=[3],
+        )
+        last = ConstraintExtractor(
+            {"target_level": [TargetLevel("word")], "transformation": [Position(-1)], "relation": [Relation("==")]},
+            target_range=["happy", "sets"],
+        )
+        without = ConstraintExtractor(
+            {"target_level": [TargetLevel("word")], "transformation": [ForEach(...)], "relation": [Relation("not in")]},
+            target_range=[["the", "a"]],
+        )
+        self.assertEqual(list(self.index.candidates(sentences)), [False, False, True, False])
+        self.assertEqual(list(self.index.candidates(last)), [True, False, True, False])
+        self.assertEqual(list(self.index.candidates(without)), [False, False, False, True])
+        c04 = Constraint(target_level=TargetLevel("character"), transformation=Count(), relation=Relation("=="))
+        c04.input_level = None # as pickled in data/all_data.dill
+        self.assertIsNone(self.index.candidates_for(c04, 20))
+
+        for constraints in [[sentences, last], [last, without], without]:
+            for conjunction in (True, False):
+                self.extractor.extract(constraints, conjunction=conjunction)
+                expected = {seq: [[s.target for s in supports] for supports in v] for seq, v in self.extractor.results.items()}
+                self.extractor.extract(constraints, conjunction=conjunction, index=self.index)
+                results = {seq: [[s.target for s in supports] for supports in v] for seq, v in self.extractor.results.items()}
+                self.assertEqual(results, expected)
@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from collie.constraints import TargetLevel, Count, Relation
+from collie.extractor_utils import TextChunker, TextLoader, ConstraintExtractor
+from collie.extract_constraints import FullExtractor, extract_sources
+
+
+def word_count(targets):
+    return ConstraintExtractor(
+        {"target_level": [TargetLevel("word")], "transformation": [Count()], "relation": [Relation("==")]},
+        target_range=targets,
+    )
+
+
+class TestConjunction(unittest.TestCase):
+    TEXTS = [("one two three\nfour five\nsix", {})] * 30
+
+    def test_same_supports(self):
+        constraints = [word_count(range(1, 4)), word_count([2]), word_count(range(10))]
+        expected = FullExtractor(TextChunker(), self.TEXTS)
+        expected.extract(constraints, adaptive=False)
+        extractor = FullExtractor(TextChunker(), self.TEXTS)
+        extractor.extract(constraints, reorder_every=5)
+        self.assertEqual(list(extractor.results), ["four five"])
+        self.assertEqual(
+            {seq: [[s.target for s in supports] for supports in v] for seq, v in extractor.results.items()},
+            {seq: [[s.target for s in supports] for supports in v] for seq, v in expected.results.items()},
+        )
+
+    def test_selective_constraint_first(self):
+        extractor = FullExtractor(TextChunker(), self.TEXTS)
+        extractor.extract([word_count(range(10)), word_count([2])], reorder_every=5)
+        stats = extractor.constraint_stats()
+        self.assertEqual(extractor._order, [1, 0])
+        self.assertEqual(stats[1]["calls"], 90)
+        self.assertAlmostEqual(stats[1]["pass_rate"], 1 / 3)
+        self.assertLess(stats[0]["calls"], 90)
+        self.assertEqual(stats[0]["pass_rate"], 1.0)
+
+
+class TestSingleScan(unittest.TestCase):
+    def test_same_as_separate_scans(self):
+        texts = [("one two three\nfour five\nsix", {"i": i}) for i in range(5)]
+        constraints = {"two": word_count([2]), "both": [word_count(range(1, 4)), word_count([1, 3])], "none": word_count([7])}
+        extractor = FullExtractor(TextChunker(), texts)
+        extractions = extractor.extract_many(constraints, max_documents=3)
+        for name, constraint in constraints.items():
+            extractor.extract(constraint, max_documents=3)
+            self.assertEqual(
+                {seq: [[s.target for s in supports] for supports in v] for seq, v in extractions[name].results.items()},
+                {seq: [[s.target for s in supports] for supports in v] for seq, v in extractor.results.items()},
+            )
+        self.assertEqual(extractions["two"].stats[0]["calls"], 9)
+        self.assertEqual(list(extractions["both"].results), ["one two three", "six"])
+
+
+class ListLoader(TextLoader):
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __iter__(self):
+        self._start()
+        self._iter = self._resume(self.docs[i] for i in self._order(len(self.docs)))
+        return self
+
+    def __next__(self):
+        return next(self._iter)
+
+    def __len__(self):
+        return len(self.docs)
+
+
+class TestExtractSources(unittest.TestCase):
+    DOCS = [(f"{' '.join(['w'] * i)}\none two\nthree", {"i": i}) for i in range(1, 9)]
+    CONSTRAINTS = {"two": word_count([2]), "few": word_count(range(1, 4))}
+
+    def extractors(self):
+        return {"a": FullExtractor(TextChunker(), ListLoader(self.DOCS)), "b": FullExtractor(TextChunker(), self.DOCS[:3])}
+
+    @staticmethod
+    def targets(results):
+        return {
+            source: {name: sorted((seq, s.target) for seq, v in r.items() for supports in v for s in supports) for name, r in named.items()}
+            for source, named in results.items()
+        }
+
+    def test_shards_same_supports(self):
+        expected = {source: results for source, results, _ in extract_sources(self.extractors(), self.CONSTRAINTS, max_documents=7)}
+        stats = {}
+        results = {}
+        for source, r, s in extract_sources(
+            self.extractors(), self.CONSTRAINTS, max_documents=7, single_scan=True, workers=2, shards_per_source=3
+        ):
+            results[source], stats[source] = r, s
+        self.assertEqual(self.targets(results), self.targets(expected))
+        self.assertEqual(stats["a"]["sequences"], 21)
+        self.assertEqual(stats["b"]["sequences"], 9)
+
+    def test_serial_without_fork(self):
+        expected = {source: results for source, results, _ in extract_sources(self.extractors(), self.CONSTRAINTS)}
+        with mock.patch("collie.extract_constraints._fork_context", return_value=None), self.assertWarns(UserWarning):
+            results = {source: results for source, results, _ in extract_sources(self.extractors(), self.CONSTRAINTS, workers=2)}
+        self.assertEqual(self.targets(results), self.targets(expected))
+
+    def test_cache_dir_leaves_extractors_alone(self):
+        extractors = self.extractors()
+        expected = {source: results for source, results, _ in extract_sources(self.extractors(), self.CONSTRAINTS)}
+        with tempfile.TemporaryDirectory() as tmp:
+            results = {source: results for source, results, _ in extract_sources(extractors, self.CONSTRAINTS, cache_dir=tmp)}
+            self.assertEqual(len(list(Path(tmp).iterdir())), 2)
+        self.assertEqual(self.targets(results), self.targets(expected))
+        self.assertEqual([e.cache_dir for e in extractors.values()], [None, None])
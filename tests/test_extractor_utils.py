@@ -0,0 +1,196 @@
+import os
+import random
+import unittest
+import dill
+from concurrent.futures import ThreadPoolExecutor
+from collie.constraints import Constraint, TargetLevel, Count, Relation
+from collie.extractor_utils import (
+    TextChunker,
+    ConstraintExtractor,
+    FilterChain,
+    chain_filters,
+    url_filter,
+    no_sents_filter,
+    chain_processors,
+    compile_processors,
+    markdown_remover,
+    remove_brackets,
+    remove_references,
+    replace_singlenewline_with_space,
+    consecutive_whitespace_remover,
+)
+
+
+class TestFilters(unittest.TestCase):
+    def test_url_filter(self):
+        self.assertTrue(url_filter("see https://www.example.com/a?b=c for more"))
+        self.assertTrue(url_filter("mail me at x.io"))
+        self.assertFalse(url_filter("An end. A start."))
+
+    def test_no_sents_filter(self):
+        self.assertTrue(no_sents_filter("No period here at all"))
+        self.assertTrue(no_sents_filter("Two words."))
+        self.assertFalse(no_sents_filter("This is a sentence."))
+
+
+class TestFilterChain(unittest.TestCase):
+    def test_short_circuit(self):
+        calls = []
+        def reject(text):
+            calls.append("reject")
+            return True
+        def never(text):
+            calls.append("never")
+            return False
+        chain = chain_filters(reject, never)
+        self.assertIsInstance(chain, FilterChain)
+        self.assertTrue(chain("text"))
+        self.assertEqual(calls, ["reject"])
+        self.assertFalse(FilterChain(never, never)("text"))
+
+    def test_reorder(self):
+        chain = FilterChain(url_filter, lambda text: text.isupper(), reorder_every=10)
+        for _ in range(20):
+            chain("TITLE")
+        self.assertEqual(list(chain.stats()), ["<lambda>", "url_filter"])
+        self.assertEqual(chain.stats()["<lambda>"]["rejected"], 20)
+        self.assertEqual(chain.stats()["url_filter"]["calls"], 9)
+
+
+class TestCompiledProcessors(unittest.TestCase):
+    TEXTS = [
+        "A *bold*  line\nwith [1] a\tref [note] and __under__ ~~strike~~.",
+        "Two\n\nparagraphs\r\n  here [1[x]] and _one\nline_",
+        "",
+        "plain text",
+    ]
+
+    FUNCS = [
+        (markdown_remover, remove_brackets, replace_singlenewline_with_space, consecutive_whitespace_remover),
+        (remove_references, remove_brackets, markdown_remover),
+        (str.strip, consecutive_whitespace_remover),
+    ]
+
+    def assertSameAsChain(self, texts):
+        for funcs in self.FUNCS:
+            chained, compiled = chain_processors(*funcs), compile_processors(*funcs)
+            expected = [chained(text) for text in texts]
+            self.assertEqual([compiled(text) for text in texts], expected)
+            self.assertEqual(compiled.bulk(texts), expected)
+
+    def test_same_as_chain(self):
+        self.assertSameAsChain(self.TEXTS)
+        self.assertSameAsChain(self.TEXTS + ["a\x00b  c"])
+
+    def test_real_passages(self):
+        # the Gutenberg, Wikipedia and CC-News passages of the COLLIE-v1 examples, alone and as documents
+        with open(os.path.join(os.path.dirname(__file__), "..", "data", "all_data.dill"), "rb") as f:
+            all_data = dill.load(f)
+        for source in ("guten", "wiki", "ccnews"):
+            texts = [item["example"] for key, items in all_data.items() if key.startswith(source + "_") for item in items]
+            self.assertTrue(texts)
+            self.assertSameAsChain(texts)
+            for sep in ("\n", "\n\n"):
+                self.assertSameAsChain([sep.join(texts[i:i + 5]) for i in range(0, len(texts), 5)])
+
+
+class TestLazyChunker(unittest.TestCase):
+    TEXT = "\n\n".join(
+        f"Paragraph {i} has a sentence. And another one." if i % 4 else "x" for i in range(40)
+    )
+
+    def chunkers(self, **kwargs):
+        kwargs = dict(paragraph_delim="\n\n", filter=lambda p: len(p) < 5, **kwargs)
+        return TextChunker(**kwargs), TextChunker(lazy=True, **kwargs)
+
+    def test_same_chunks(self):
+        for mode in [dict(), dict(chunk_by_passage=True)]:
+            eager, lazy = self.chunkers(**mode)
+            self.assertEqual(list(lazy(self.TEXT)), list(eager(self.TEXT)))
+            self.assertEqual((lazy.total, lazy.rejected), (eager.total, eager.rejected))
+            random.seed(0)
+            eager, lazy = self.chunkers(randomize=True, buffer_size=2, **mode)
+            self.assertEqual(sorted(lazy(self.TEXT)), sorted(eager(self.TEXT)))
+
+    def test_random_passages_filtered_once(self):
+        def short(p):
+            return len(p) < 5
+        chunker = TextChunker(paragraph_delim="\n\n", filter=FilterChain(short), randomize=True, chunk_by_passage=True, lazy=True)
+        for seed in range(5):
+            random.seed(seed)
+            chunks = chunker(self.TEXT)
+            list(chunks)
+            self.assertEqual(chunks.filter.total, 40)
+
+    def test_on_demand(self):
+        calls = []
+        chunker = TextChunker(paragraph_delim="\n\n", postprocessor=lambda p: calls.append(p) or p, lazy=True)
+        self.assertEqual(next(iter(chunker(self.TEXT))), "x")
+        self.assertEqual(len(calls), 1)
+        with self.assertRaises(TypeError):
+            len(chunker)
+
+
+class TestReentrant(unittest.TestCase):
+    def test_chunker_threads(self):
+        texts = [TestLazyChunker.TEXT[:n] for n in range(0, len(TestLazyChunker.TEXT), 7)] * 5
+        chunker = TextChunker(paragraph_delim="\n\n", filter=lambda p: len(p) < 5, chunk_by_passage=True)
+        expected = [list(chunker(text)) for text in texts]
+        total, rejected = chunker.total, chunker.rejected
+        chunker.reset_stats()
+        with ThreadPoolExecutor(8) as pool:
+            self.assertEqual(list(pool.map(lambda text: list(chunker(text)), texts)), expected)
+        self.assertEqual((chunker.total, chunker.rejected), (total, rejected))
+
+    def test_filter_stats_threads(self):
+        texts = [TestLazyChunker.TEXT[:n] for n in range(0, len(TestLazyChunker.TEXT), 7)] * 5
+        def single(p):
+            return p == "x"
+        def short(p):
+            return len(p) < 5
+        chain = FilterChain(single, short, adaptive=False)
+        chunker = TextChunker(paragraph_delim="\n\n", filter=chain, chunk_by_passage=True)
+        for text in texts:
+            list(chunker(text))
+        expected = chain.stats()
+        chain.reset_stats()
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda text: list(chunker(text)), texts))
+        counts = lambda stats: {name: (s["calls"], s["rejected"]) for name, s in stats.items()}
+        self.assertEqual(counts(chain.stats()), counts(expected))
+        chunks = chunker(TestLazyChunker.TEXT)
+        list(chunks)
+        self.assertEqual(chunks.filter.total, 40)
+        self.assertEqual(chunks.filter.stats()["single"]["rejected"], 10)
+
+    def test_nested_extraction(self):
+        extractor = ConstraintExtractor(
+            {"target_level": [TargetLevel("word")], "transformation": [Count()], "relation": [Relation("==")]},
+            target_range=range(1, 4),
+        )
+        outer = extractor("two words")
+        results = []
+        for sat, (_, target) in outer:
+            results.append((sat, target, [s for s, _ in extractor("one")]))
+        self.assertEqual(results, [(False, 1, [True, False, False]), (True, 2, [True, False, False]), (False, 3, [True, False, False])])
+
+
+class CountingConstraint(Constraint):
+    calls = 0
+
+    def extract(self, text):
+        CountingConstraint.calls += 1
+        return super().extract(text)
+
+
+class TestSinglePassExtraction(unittest.TestCase):
+    def test_extract_once_per_config(self):
+        init_range = {"target_level": [TargetLevel("word"), TargetLevel("character")], "transformation": [Count()], "relation": [Relation("==")]}
+        CountingConstraint.calls = 0
+        results = list(ConstraintExtractor(init_range, target_range=range(10), ConstraintCls=CountingConstraint)("two words"))
+        self.assertEqual(CountingConstraint.calls, 2)
+        self.assertEqual([target for sat, (_, target) in results if sat], [2, 9])
+        CountingConstraint.calls = 0
+        results = list(ConstraintExtractor(init_range, ConstraintCls=CountingConstraint)("two words"))
+        self.assertEqual(CountingConstraint.calls, 2)
+        self.assertEqual([x for _, (_, x) in results], [2, 9])
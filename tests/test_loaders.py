@@ -0,0 +1,159 @@
+import json
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+from datasets import Dataset
+from collie.extractor_utils import DatasetLoader
+from collie.gutenberg_extractor import GutenbergLoader
+from collie.english_extractor import EnglishLoader
+
+
+def make_dataset(n=50):
+    return Dataset.from_dict({
+        "text": [f"text {i}" for i in range(n)],
+        "title": [f"title {i}" for i in range(n)],
+        "url": [f"url {i}" for i in range(n)],
+    })
+
+
+_forked = {}
+
+
+def _books_in_child(_):
+    return list(_forked["loader"])
+
+
+class TestDatasetLoader(unittest.TestCase):
+    def test_streaming_same_rows(self):
+        dataset = make_dataset()
+        rows = list(DatasetLoader(dataset))
+        streamed = list(DatasetLoader(dataset, streaming=True, batch_size=7))
+        self.assertEqual(streamed, rows)
+        self.assertEqual(streamed[3], ("text 3", {"title": "title 3", "url": "url 3", "index": 3}))
+
+    def test_streaming_columns(self):
+        loader = DatasetLoader(make_dataset(), streaming=True, columns=("index", "title"))
+        self.assertEqual(next(iter(loader)), ("text 0", {"title": "title 0", "index": 0}))
+
+    def test_streaming_randomize(self):
+        dataset = make_dataset()
+        loader = DatasetLoader(dataset, randomize=True, streaming=True, batch_size=5, buffer_size=8, seed=0)
+        rows = list(loader)
+        self.assertNotEqual(rows, list(DatasetLoader(dataset)))
+        self.assertEqual(sorted(meta["index"] for _, meta in rows), list(range(len(dataset))))
+        self.assertTrue(all(txt == f"text {meta['index']}" for txt, meta in rows))
+        self.assertEqual(list(loader), rows)
+
+
+def indices(loader):
+    return [meta["index"] for _, meta in loader]
+
+
+def take(loader, n=None):
+    # consume an iteration that was already started without restarting it
+    rows = []
+    while n is None or len(rows) < n:
+        try:
+            rows.append(next(loader))
+        except StopIteration:
+            break
+    return rows
+
+
+class TestShardingAndResume(unittest.TestCase):
+    def test_shards_partition(self):
+        dataset = make_dataset()
+        for kwargs in [dict(), dict(streaming=True, batch_size=4, buffer_size=6)]:
+            shards = [indices(DatasetLoader(dataset, randomize=True, seed=1, **kwargs).shard(3, i)) for i in range(3)]
+            self.assertEqual(sorted(sum(shards, [])), list(range(len(dataset))))
+            self.assertEqual(shards[0], indices(DatasetLoader(dataset, randomize=True, seed=1, **kwargs).shard(3, 0)))
+
+    def test_sharding_requires_seed(self):
+        with self.assertRaises(ValueError):
+            iter(DatasetLoader(make_dataset(), randomize=True).shard(2, 0))
+
+    def test_resume(self):
+        dataset = make_dataset()
+        for kwargs in [dict(), dict(streaming=True, batch_size=4, buffer_size=6)]:
+            loader = iter(DatasetLoader(dataset, randomize=True, seed=3, **kwargs).shard(2, 1))
+            first = indices(take(loader, 7))
+            state = json.loads(json.dumps(loader.state_dict()))
+            rest = indices(take(loader))
+
+            resumed = DatasetLoader(dataset, randomize=True, **kwargs)
+            resumed.load_state_dict(state)
+            self.assertEqual(indices(resumed), rest)
+            self.assertEqual(first + rest, indices(DatasetLoader(dataset, randomize=True, seed=3, **kwargs).shard(2, 1)))
+
+    def test_file_loaders(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            metadata = []
+            for i in range(6):
+                tmp.joinpath(f"{i}.txt").write_text(f"book {i}")
+                metadata.append({"gd-path": f"{i}.txt", "Language": ["English"] if i != 2 else ["French"]})
+            tmp.joinpath("metadata.json").write_text(json.dumps(metadata))
+            tmp.joinpath("english3.txt").write_text("a\nb\nc\nd\ne")
+
+            loader = GutenbergLoader(tmp / "metadata.json", randomize=True, seed=0)
+            books = [txt for txt, _ in loader]
+            self.assertEqual(sorted(books), ["book 0", "book 1", "book 3", "book 4", "book 5"])
+            loader = iter(GutenbergLoader(tmp / "metadata.json", randomize=True))
+            first = [txt for txt, _ in take(loader, 2)]
+            resumed = GutenbergLoader(tmp / "metadata.json", randomize=True)
+            resumed.load_state_dict(loader.state_dict())
+            rest = [txt for txt, _ in resumed]
+            self.assertEqual(rest, [txt for txt, _ in take(loader)])
+            self.assertEqual(sorted(first + rest), sorted(books))
+
+            words = [txt for i in range(2) for txt, _ in EnglishLoader(str(tmp)).shard(2, i)]
+            self.assertEqual(words, ["a\nc\ne", "b\nd"])
+
+    def test_gutenberg_prefetch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            metadata = []
+            for i in range(20):
+                tmp.joinpath(f"{i}.txt").write_bytes(f"book {i}\r\nline\rend\n".encode() * (i + 1))
+                metadata.append({"gd-path": f"{i}.txt", "Language": ["English"] if i % 5 else ["German"]})
+            tmp.joinpath("metadata.json").write_text(json.dumps(metadata))
+            path = tmp / "metadata.json"
+
+            books = list(GutenbergLoader(path, randomize=True, seed=0))
+            loader = GutenbergLoader(path, randomize=True, seed=0, prefetch=3, num_workers=2)
+            self.assertEqual(list(loader), books)
+            self.assertEqual(len(loader), len(books))
+            self.assertEqual(loader.prefetch_stats()["books"], 16)
+
+            loader = iter(loader)
+            first = take(loader, 5)
+            resumed = GutenbergLoader(path, randomize=True, prefetch=2)
+            resumed.load_state_dict(loader.state_dict())
+            self.assertEqual(first + list(resumed), books)
+            queued = [future for future, _ in loader._queue]
+            loader.close()
+            self.assertTrue(queued and all(future.done() for future in queued))
+            resumed.close()
+
+            # a forked worker can't use the threads of the parent's executor
+            _forked["loader"] = loader
+            try:
+                list(loader)
+                with multiprocessing.get_context("fork").Pool(1) as pool:
+                    self.assertEqual(pool.map_async(_books_in_child, [0]).get(timeout=60), [books])
+            finally:
+                _forked.clear()
+                loader.close()
+
+
+class TestLazySources(unittest.TestCase):
+    def test_built_once_on_access(self):
+        from collie.examples import sources
+        self.assertEqual(sources.LOADERS._values, {})
+        built = []
+        registry = sources.LazyRegistry({"a": lambda: built.append("a") or len(built), "b": lambda: built.append("b")})
+        self.assertEqual(list(registry), ["a", "b"])
+        self.assertEqual(built, [])
+        self.assertEqual((registry["a"], registry["a"]), (1, 1))
+        self.assertEqual(built, ["a"])
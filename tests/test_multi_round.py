@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+from collie.constraints import Constraint, TargetLevel, Count, Relation
+from collie.multi_round import round_keys, run_multi_round
+
+
+class FakeModel:
+    """Answers with a fixed text per round, the first example is slow."""
+    def __init__(self, answers):
+        self.answers = answers
+        self.requests = []
+
+    async def __call__(self, messages):
+        prompt = messages[0]["content"]
+        round_ = len(messages) // 2
+        self.requests.append((prompt, round_))
+        await asyncio.sleep(0.05 if prompt == "slow" else 0.001)
+        return self.answers[round_]
+
+
+class TestMultiRound(unittest.TestCase):
+    def setUp(self):
+        c = Constraint(
+            target_level=TargetLevel('word'),
+            transformation=Count(),
+            relation=Relation('=='),
+        )
+        self.examples = [
+            {"prompt": "slow", "constraint": c, "targets": 2},
+            {"prompt": "fast", "constraint": c, "targets": 4},
+        ]
+
+    def test_pipelined_rounds(self):
+        model = FakeModel(["one word here", "two words", "three words here now", "four"])
+        log = asyncio.run(run_multi_round(self.examples, model, rounds=4, drop_satisfied=True))
+        self.assertEqual(list(log), round_keys(4) + ["num_rounds"])
+        # the fast example moves on without waiting for the slow one
+        self.assertLess(model.requests.index(("fast", 2)), model.requests.index(("slow", 1)))
+        # both examples drop out once satisfied, the last text is carried forward
+        self.assertEqual(log["num_rounds"], [2, 3])
+        self.assertEqual(log["4th_round_text"], ["two words", "three words here now"])
+        self.assertEqual(log["3rd_round_feedback"][1], "The generated sentence satisfies all constraints.")
+        self.assertTrue(log["1st_round_feedback"][0].startswith("Your task is to generate a sentence with exactly 2 words."))
+
+    def test_all_rounds(self):
+        model = FakeModel(["one word here", "two words", "three words here now", "four"])
+        log = asyncio.run(run_multi_round(self.examples, model, rounds=3, drop_satisfied=False))
+        self.assertEqual(log["num_rounds"], [3, 3])
+        self.assertEqual(log["3rd_round_text"], ["three words here now", "three words here now"])
+        self.assertNotIn("3rd_round_feedback", log)
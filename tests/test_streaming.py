@@ -0,0 +1,79 @@
+import unittest
+from collie.constraints import (
+    TargetLevel,
+    InputLevel,
+    Relation,
+    Reduction,
+    Count,
+    Position,
+    ForEach,
+    Constraint,
+    All,
+)
+from collie.streaming import StreamingConstraint
+
+
+TEXT = 'This is a sentence. This is another sentence. This is the third sentence.\n\nThis is the fourth sentence. This is a slightly longer fifth sentence.'
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestStreamingConstraint(unittest.TestCase):
+    def test_matches_full_extraction(self):
+        constraints = [
+            Constraint(target_level=TargetLevel('word'), transformation=Count(), relation=Relation('==')),
+            Constraint(target_level=TargetLevel('sentence'), transformation=Count(), relation=Relation('==')),
+            Constraint(target_level=TargetLevel('paragraph'), transformation=Count(), relation=Relation('==')),
+            Constraint(target_level=TargetLevel('character'), transformation=Count(), relation=Relation('==')),
+            Constraint(
+                input_level=InputLevel('sentence'),
+                target_level=TargetLevel('word'),
+                transformation=ForEach(Position(-1)),
+                relation=Relation('=='),
+                reduction=Reduction('all'),
+            ),
+        ]
+        for c in constraints:
+            for size in (1, 7, 30):
+                stream = StreamingConstraint(c)
+                for chunk in chunks(TEXT, size):
+                    stream.update(chunk)
+                    self.assertEqual(stream.extract(), c.extract(stream.text))
+
+    def test_check(self):
+        c = Constraint(target_level=TargetLevel('word'), transformation=Count(), relation=Relation('=='))
+        stream = StreamingConstraint(c, target=5)
+        for chunk in chunks('This is a good sentence.', 4):
+            stream.update(chunk)
+        self.assertTrue(stream.check())
+        self.assertFalse(stream.check(4))
+
+    def test_can_satisfy_count(self):
+        c = Constraint(target_level=TargetLevel('sentence'), transformation=Count(), relation=Relation('<='))
+        stream = StreamingConstraint(c, target=2)
+        stream.update('This is a sentence. This is another sentence.')
+        self.assertTrue(stream.can_satisfy())
+        stream.update(' This is the third sentence. This is the fourth sentence. And a fifth')
+        self.assertFalse(stream.can_satisfy())
+
+    def test_can_satisfy_not_in(self):
+        c = Constraint(target_level=TargetLevel('word'), transformation=ForEach(...), relation=Relation('not in'))
+        stream = StreamingConstraint(c, target=['the', 'be'])
+        stream.update('This is a sentence. This is another sentence. ')
+        self.assertTrue(stream.can_satisfy())
+        stream.update('This is the third sentence. This is the fourth sentence. And a fifth.')
+        self.assertFalse(stream.can_satisfy())
+        self.assertFalse(stream.check())
+
+    def test_logic(self):
+        c = All(
+            Constraint(target_level=TargetLevel('word'), transformation=Count(), relation=Relation('==')),
+            Constraint(target_level=TargetLevel('word'), transformation=Position(3), relation=Relation('==')),
+        )
+        stream = StreamingConstraint(c, target=[5, 'good'])
+        for chunk in chunks('This is a good sentence.', 3):
+            stream.update(chunk)
+        self.assertTrue(stream.check())
+        self.assertEqual(stream.check(), c.check(stream.text, [5, 'good']))
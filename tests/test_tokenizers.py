@@ -0,0 +1,73 @@
+import pickle
+import unittest
+import multiprocessing
+import nltk
+from collie import tokenizers
+from collie.constraints import TargetLevel
+from collie.tokenizers import (
+    MemoTokenizer,
+    NLTKTokenizer,
+    RegexTokenizer,
+    compare_tokenizers,
+    get_tokenizer,
+    set_tokenizer,
+    get_punkt,
+    preload,
+    sent_tokenize,
+)
+
+
+TEXTS = [
+    'This is a good sentence.',
+    'This is a sentence. This is another sentence. This is the third utterance.',
+    'He said "I cannot go," and left. She didn\'t (really) care; the dogs\' food was gone...',
+    '"Quoted at the start," he wrote.\n"And after a newline" -- then 3,000 or 3.5 U.S. dollars!',
+    'It\'s well-known that \'tis the season, gonna be fun? The end."',
+    'Words with [brackets], {braces} and <tags> & symbols like $5, #tag, @me*.',
+    # quotes before a tab or newline are not split off like before a space
+    "xb)b`''ll'll)b's'\nb",
+    "s-b's ,s's'\t)s",
+    "?.'xa's'\tn't",
+    "-b'lls''ll's'\t 'b",
+]
+
+
+class TestTokenizers(unittest.TestCase):
+    def test_backends_agree(self):
+        self.assertEqual(compare_tokenizers(TEXTS, NLTKTokenizer(), RegexTokenizer()), [])
+
+    def test_set_tokenizer(self):
+        previous = set_tokenizer("regex")
+        try:
+            self.assertIsInstance(get_tokenizer(), RegexTokenizer)
+            words = TargetLevel('word')(TEXTS[0])
+        finally:
+            set_tokenizer(previous)
+        self.assertEqual(words, ['This', 'is', 'a', 'good', 'sentence'])
+        self.assertEqual(TargetLevel('word')(TEXTS[0]), words)
+
+    def test_pickle(self):
+        # backends are sent to spawned workers as they are
+        for tokenizer in (RegexTokenizer(), MemoTokenizer(RegexTokenizer())):
+            copy = pickle.loads(pickle.dumps(tokenizer))
+            self.assertEqual([copy.words(text) for text in TEXTS], [tokenizer.words(text) for text in TEXTS])
+
+    def test_unknown_tokenizer(self):
+        with self.assertRaises(ValueError):
+            set_tokenizer("whitespace")
+
+
+def _loaded_punkt(_):
+    return sorted(tokenizers._punkt)
+
+
+class TestPunkt(unittest.TestCase):
+    def test_shared_model(self):
+        self.assertIs(get_punkt(), RegexTokenizer().punkt)
+        for text in TEXTS:
+            self.assertEqual(sent_tokenize(text), nltk.sent_tokenize(text))
+
+    def test_inherited_by_forked_workers(self):
+        preload()
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            self.assertEqual(pool.map(_loaded_punkt, [0]), [["english"]])